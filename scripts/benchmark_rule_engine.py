@@ -0,0 +1,303 @@
+"""
+Benchmark suite for the rule engine and the bootstrap dataset generator.
+
+Runs each benchmark case against seeded synthetic lexicons (short words,
+long words and a CMUdict-scale lexicon) and reports words/sec, per-call
+latency percentiles and peak traced memory. Every run is appended to a
+JSONL history file. With --fail-on-regression, each case is compared
+with a baseline, so a rule-table change that costs throughput is caught
+before it ships: by default the median words/sec of that case over the
+last --baseline-runs runs in the history (one noisy run neither hides
+nor fakes a regression), or a pinned run written by --pin-baseline and
+read back with --baseline. The cluster-rule automaton
+(src/rule_engine/rule_automaton.py) is benchmarked per word and batched.
+
+Usage:
+  python -m scripts.benchmark_rule_engine
+  python -m scripts.benchmark_rule_engine --lexicons short long --repeat 5 \
+      --fail-on-regression 0.30
+  python -m scripts.benchmark_rule_engine --pin-baseline data/benchmarks/baseline.jsonl
+  python -m scripts.benchmark_rule_engine --baseline data/benchmarks/baseline.jsonl \
+      --fail-on-regression 0.30
+
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from io import StringIO
+from pathlib import Path
+
+from src.rule_engine import rule_engine, rule_engine_v2
+from src.rule_engine.batch import StrokeTables, phonemes_to_strokes_batch
+from src.rule_engine.outline_cache import rule_table_version
+from src.rule_engine.rule_automaton import PITMAN_CLUSTER_RULES, compile_rules
+
+DEFAULT_HISTORY = Path('data/benchmarks/rule_engine_history.jsonl')
+DEFAULT_BASELINE_RUNS = 5
+
+CONSONANTS = ['P', 'B', 'T', 'D', 'CH', 'JH', 'F', 'V', 'TH', 'DH', 'S', 'Z', 'SH',
+              'ZH', 'K', 'G', 'M', 'N', 'NG', 'L', 'R', 'W', 'Y', 'HH']
+VOWELS = ['AA', 'AE', 'AH', 'AO', 'AW', 'AY', 'EH', 'ER', 'EY', 'IH', 'IY', 'OW',
+          'OY', 'UH', 'UW']
+
+# name -> (number of words, min phonemes, max phonemes)
+LEXICONS = {
+    'short': (20000, 1, 3),
+    'long': (20000, 8, 15),
+    'cmudict': (130000, 1, 12),
+}
+
+BATCH_CHUNK = 1024
+
+
+def synthetic_lexicon(name: str, seed: int = 0):
+    """Seeded list of ARPAbet phoneme lists with stress digits on vowels."""
+    count, lo, hi = LEXICONS[name]
+    rng = random.Random(f'{name}:{seed}')
+    words = []
+    for _ in range(count):
+        phonemes = []
+        for i in range(rng.randint(lo, hi)):
+            if i % 2 and rng.random() < 0.8:
+                phonemes.append(rng.choice(VOWELS) + str(rng.randint(0, 2)))
+            else:
+                phonemes.append(rng.choice(CONSONANTS))
+        words.append(phonemes)
+    return words
+
+
+def _per_word(fn):
+    def run(words):
+        latencies = []
+        clock = time.perf_counter_ns
+        for w in words:
+            t0 = clock()
+            fn(w)
+            latencies.append(clock() - t0)
+        return latencies
+    return run
+
+
+def _batched(words):
+    # fresh tables per run so interning cost is measured every time
+    tables = StrokeTables()
+    latencies = []
+    for i in range(0, len(words), BATCH_CHUNK):
+        chunk = words[i:i + BATCH_CHUNK]
+        t0 = time.perf_counter_ns()
+        phonemes_to_strokes_batch(chunk, tables).to_lists()
+        # report per-word latency so the numbers compare with scalar cases
+        latencies.extend([(time.perf_counter_ns() - t0) / len(chunk)] * len(chunk))
+    return latencies
+
+
+def _automaton_per_word(words):
+    # compiled once per run, outside the timed calls
+    return _per_word(compile_rules().phonemes_to_strokes)(words)
+
+
+def _automaton_batched(words):
+    automaton = compile_rules()
+    latencies = []
+    for i in range(0, len(words), BATCH_CHUNK):
+        chunk = words[i:i + BATCH_CHUNK]
+        t0 = time.perf_counter_ns()
+        automaton.apply_batch(chunk).to_lists()
+        latencies.extend([(time.perf_counter_ns() - t0) / len(chunk)] * len(chunk))
+    return latencies
+
+
+def _v2_positioning_loop(phonemes):
+    # the per-phoneme pattern from rule_engine_v2's original __main__ block
+    out = []
+    for i, p in enumerate(phonemes):
+        out.extend(rule_engine_v2.apply_positioning(
+            rule_engine_v2.phonemes_to_strokes([p]), i, len(phonemes)))
+    return out
+
+
+def _generate(words):
+    from scripts import generate_bootstrap_dataset
+
+    with tempfile.TemporaryDirectory() as tmp:
+        wordlist = Path(tmp) / 'words.txt'
+        # synthetic spellings: OOV for CMUdict, exercising the fallback path
+        wordlist.write_text('\n'.join(''.join(p[0].lower() for p in w) + str(i)
+                                      for i, w in enumerate(words)) + '\n', encoding='utf-8')
+        t0 = time.perf_counter_ns()
+        with redirect_stdout(StringIO()):
+            generate_bootstrap_dataset.generate(wordlist, Path(tmp) / 'out.jsonl')
+        elapsed = time.perf_counter_ns() - t0
+    return [elapsed / len(words)] * len(words)
+
+
+CASES = {
+    'v1.phonemes_to_strokes': _per_word(rule_engine.phonemes_to_strokes),
+    'v2.phonemes_to_strokes': _per_word(rule_engine_v2.phonemes_to_strokes),
+    'v2.apply_positioning': _per_word(_v2_positioning_loop),
+    'v2.position_word': _per_word(rule_engine_v2.position_word),
+    'batch.phonemes_to_strokes_batch': _batched,
+    'automaton.phonemes_to_strokes': _automaton_per_word,
+    'automaton.apply_batch': _automaton_batched,
+    'generate_bootstrap_dataset.generate': _generate,
+}
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, int(round(q / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+
+def run_case(case: str, lexicon: str, words, repeat: int):
+    fn = CASES[case]
+    best_elapsed = None
+    best_latencies = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        latencies = fn(words)
+        elapsed = time.perf_counter() - t0
+        if best_elapsed is None or elapsed < best_elapsed:
+            best_elapsed, best_latencies = elapsed, latencies
+
+    # memory is measured in a separate pass; tracemalloc distorts timings
+    tracemalloc.start()
+    fn(words)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    lat = sorted(best_latencies)
+    return {
+        'case': case,
+        'lexicon': lexicon,
+        'words': len(words),
+        'words_per_sec': round(len(words) / best_elapsed, 1),
+        'latency_us': {
+            'p50': round(_percentile(lat, 50) / 1000.0, 3),
+            'p95': round(_percentile(lat, 95) / 1000.0, 3),
+            'p99': round(_percentile(lat, 99) / 1000.0, 3),
+            'mean': round(statistics.fmean(lat) / 1000.0, 3),
+        },
+        'peak_memory_kb': round(peak / 1024.0, 1),
+    }
+
+
+def _git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def load_history(path: Path):
+    if not path.exists():
+        return []
+    with path.open('r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def baseline(history, runs: int = DEFAULT_BASELINE_RUNS):
+    """(case, lexicon) -> median words/sec over its last `runs` runs."""
+    samples = {}
+    for run in history:
+        for r in run['results']:
+            samples.setdefault((r['case'], r['lexicon']), []).append(r['words_per_sec'])
+    return {key: statistics.median(values[-runs:]) for key, values in samples.items()}
+
+
+def compare(results, base, threshold: float):
+    """Return regression messages versus the baseline words/sec of each case."""
+    regressions = []
+    for r in results:
+        expected = base.get((r['case'], r['lexicon']))
+        if not expected:
+            continue
+        change = r['words_per_sec'] / expected - 1.0
+        r['change_vs_baseline'] = round(change, 4)
+        if change < -threshold:
+            regressions.append(f"{r['case']} [{r['lexicon']}]: {expected} -> "
+                               f"{r['words_per_sec']} words/sec ({change:+.1%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--cases', nargs='*', default=list(CASES), choices=list(CASES))
+    parser.add_argument('--lexicons', nargs='*', default=list(LEXICONS), choices=list(LEXICONS))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--history', type=str, default=str(DEFAULT_HISTORY))
+    parser.add_argument('--no-save', action='store_true', help='do not append to history')
+    parser.add_argument('--fail-on-regression', type=float, default=None, metavar='FRACTION',
+                        help='compare with the baseline and exit non-zero if words/sec '
+                             'drops by more than FRACTION')
+    parser.add_argument('--baseline', type=str, default=None, metavar='PATH',
+                        help='baseline runs (JSONL, e.g. from --pin-baseline; default: --history)')
+    parser.add_argument('--baseline-runs', type=int, default=DEFAULT_BASELINE_RUNS, metavar='N',
+                        help='median over the last N baseline runs of each case')
+    parser.add_argument('--pin-baseline', type=str, default=None, metavar='PATH',
+                        help='write this run to PATH as the pinned baseline')
+    args = parser.parse_args()
+    if args.baseline_runs < 1:
+        parser.error('--baseline-runs must be >= 1')
+
+    results = []
+    for lexicon in args.lexicons:
+        words = synthetic_lexicon(lexicon, args.seed)
+        for case in args.cases:
+            r = run_case(case, lexicon, words, args.repeat)
+            results.append(r)
+            lat = r['latency_us']
+            print(f"{case:38s} {lexicon:8s} {r['words_per_sec']:>12,.0f} w/s  "
+                  f"p50 {lat['p50']:>8.2f}us  p95 {lat['p95']:>8.2f}us  "
+                  f"p99 {lat['p99']:>8.2f}us  peak {r['peak_memory_kb']:>10,.0f} KiB")
+
+    history_path = Path(args.history)
+    regressions = []
+    if args.fail_on_regression is not None:
+        baseline_path = Path(args.baseline) if args.baseline else history_path
+        base = baseline(load_history(baseline_path), args.baseline_runs)
+        regressions = compare(results, base, args.fail_on_regression)
+        for msg in regressions:
+            print('REGRESSION', msg)
+
+    run = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'revision': _git_revision(),
+        'python': sys.version.split()[0],
+        'rule_table_version': rule_table_version(rule_engine.PHONEME_TO_STROKE,
+                                                 rule_engine_v2.PHONEME_TO_STROKE,
+                                                 rule_engine_v2.VOWEL_MARKERS,
+                                                 PITMAN_CLUSTER_RULES),
+        'seed': args.seed,
+        'results': results,
+    }
+    if not args.no_save:
+        history_path.parent.mkdir(parents=True, exist_ok=True)
+        with history_path.open('a', encoding='utf-8') as f:
+            f.write(json.dumps(run) + '\n')
+        print(f'Appended results to {history_path}')
+    if args.pin_baseline:
+        pin_path = Path(args.pin_baseline)
+        pin_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = pin_path.with_name(pin_path.name + '.tmp')
+        tmp.write_text(json.dumps(run) + '\n', encoding='utf-8')
+        os.replace(tmp, pin_path)
+        print(f'Pinned baseline {pin_path}')
+
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
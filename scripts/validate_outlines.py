@@ -0,0 +1,209 @@
+"""
+Validate outline datasets against the canonical stroke registry.
+
+Loads the stroke registry (data/strokes/unit_*.json, see
+src/rule_engine/stroke_registry.py) once, then checks every
+rule_outlines id of one or more outline JSONL files in a single streaming
+pass. Reports:
+  - unknown ids (neither in the registry, nor RAW_ / V_ tokens)
+  - RAW_<PHONEME> tokens (phonemes no rule maps yet)
+  - vowel markers (V_*), counted separately; they are informational
+  - per-unit coverage: how often each registry stroke is used, with
+    example words, and which strokes never occur
+  - registry problems: pairs_with references that do not resolve
+
+With --workers N each file is split into N byte ranges (cut at line
+boundaries) that are scanned in parallel and merged.
+
+Exits with status 1 when unknown ids or broken pairs_with references are
+found.
+
+Usage:
+  python -m scripts.validate_outlines data/outlines/bootstrap_sample.jsonl
+  python -m scripts.validate_outlines big.jsonl --workers 8 --json report.json
+
+"""
+import argparse
+import json
+import os
+import sys
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from src.rule_engine.stroke_registry import DEFAULT_REGISTRY_GLOB, StrokeRegistry, load_registry
+
+EXAMPLES = 3
+READ_BUFFER_SIZE = 1 << 20
+
+
+class OutlineReport:
+    """Mergeable counters for one scan (or one byte range of a scan)."""
+
+    def __init__(self):
+        self.entries = 0
+        self.tokens = 0
+        self.bad_lines = 0
+        self.known = Counter()
+        self.unknown = Counter()
+        self.raw = Counter()
+        self.vowels = Counter()
+        self.examples = defaultdict(list)
+
+    def _example(self, token: str, word: str) -> None:
+        examples = self.examples[token]
+        if len(examples) < EXAMPLES and word not in examples:
+            examples.append(word)
+
+    def add(self, entry: dict, known_ids) -> None:
+        self.entries += 1
+        word = entry.get('word', '')
+        strokes = entry.get('rule_outlines') or []
+        self.tokens += len(strokes)
+        for token in strokes:
+            if token in known_ids:
+                counter = self.known
+            elif token.startswith('V_'):
+                self.vowels[token] += 1
+                continue
+            elif token.startswith('RAW_'):
+                counter = self.raw
+            else:
+                counter = self.unknown
+            counter[token] += 1
+            self._example(token, word)
+
+    def merge(self, other: 'OutlineReport') -> None:
+        self.entries += other.entries
+        self.tokens += other.tokens
+        self.bad_lines += other.bad_lines
+        self.known.update(other.known)
+        self.unknown.update(other.unknown)
+        self.raw.update(other.raw)
+        self.vowels.update(other.vowels)
+        for token, words in other.examples.items():
+            for word in words:
+                self._example(token, word)
+
+    def summary(self, registry: StrokeRegistry, top: int = 20) -> dict:
+        units = {
+            unit: {sid: {'count': self.known.get(sid, 0), 'examples': self.examples.get(sid, [])}
+                   for sid in ids}
+            for unit, ids in registry.by_unit.items()
+        }
+        return {
+            'entries': self.entries,
+            'tokens': self.tokens,
+            'bad_lines': self.bad_lines,
+            'unknown_ids': {t: {'count': n, 'examples': self.examples[t]}
+                            for t, n in self.unknown.most_common()},
+            'raw_tokens': sum(self.raw.values()),
+            'top_raw': [(t, n, self.examples[t]) for t, n in self.raw.most_common(top)],
+            'vowel_markers': dict(self.vowels.most_common()),
+            'coverage': {
+                str(unit): {
+                    'used': sum(1 for s in ids.values() if s['count']),
+                    'total': len(ids),
+                    'strokes': ids,
+                }
+                for unit, ids in sorted(units.items())
+            },
+        }
+
+
+def _line_ranges(path: Path, parts: int):
+    """Split a file into up to `parts` [start, end) byte ranges on line
+    boundaries."""
+    size = path.stat().st_size
+    if parts <= 1 or size == 0:
+        return [(0, size)]
+    cuts = [0]
+    with path.open('rb') as f:
+        for i in range(1, parts):
+            f.seek(max(size * i // parts, cuts[-1]))
+            if f.tell() > 0:
+                f.readline()  # finish the line we landed in
+            cuts.append(min(f.tell(), size))
+    cuts.append(size)
+    return [(a, b) for a, b in zip(cuts, cuts[1:]) if b > a]
+
+def scan_range(path: Path, start: int, end: int, known_ids) -> OutlineReport:
+    report = OutlineReport()
+    with path.open('rb', buffering=READ_BUFFER_SIZE) as f:
+        f.seek(start)
+        pos = start
+        for line in f:
+            if pos >= end:
+                break
+            pos += len(line)
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                report.bad_lines += 1
+                continue
+            report.add(entry, known_ids)
+    return report
+
+def validate(paths, registry: StrokeRegistry, workers: int = 1) -> OutlineReport:
+    known_ids = registry.ids
+    report = OutlineReport()
+    if workers <= 1:
+        for path in paths:
+            report.merge(scan_range(path, 0, path.stat().st_size, known_ids))
+        return report
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(scan_range, path, a, b, known_ids)
+                   for path in paths for a, b in _line_ranges(path, workers)]
+        for future in futures:
+            report.merge(future.result())
+    return report
+
+def format_summary(summary: dict, broken_pairs: list) -> str:
+    lines = [f"{summary['entries']} entries, {summary['tokens']} stroke tokens"
+             + (f", {summary['bad_lines']} unparseable lines" if summary['bad_lines'] else '')]
+    unknown = summary['unknown_ids']
+    lines.append(f'unknown ids: {len(unknown)}')
+    for token, info in unknown.items():
+        lines.append(f"  {token}: {info['count']} (e.g. {', '.join(info['examples'])})")
+    lines.append(f"RAW tokens: {summary['raw_tokens']}")
+    for token, n, examples in summary['top_raw']:
+        lines.append(f"  {token}: {n} (e.g. {', '.join(examples)})")
+    vowels = summary['vowel_markers']
+    lines.append(f'vowel markers: {sum(vowels.values())} '
+                 f'({", ".join(f"{t}={n}" for t, n in vowels.items())})')
+    for unit, cov in summary['coverage'].items():
+        lines.append(f"unit {unit}: {cov['used']}/{cov['total']} strokes used")
+        for sid, info in cov['strokes'].items():
+            examples = f" (e.g. {', '.join(info['examples'])})" if info['examples'] else ''
+            lines.append(f"  {sid}: {info['count']}{examples}")
+    lines.append(f'broken pairs_with: {len(broken_pairs)}')
+    for sid, target in broken_pairs:
+        lines.append(f'  {sid} -> {target}')
+    return '\n'.join(lines)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Validate outlines against the stroke registry')
+    parser.add_argument('outlines', nargs='+', help='outline JSONL files')
+    parser.add_argument('--registry', type=str, default=DEFAULT_REGISTRY_GLOB,
+                        help='glob of stroke registry unit files')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='scan byte ranges in N processes')
+    parser.add_argument('--json', type=str, default=None, help='also write the report here')
+    args = parser.parse_args()
+
+    registry = load_registry(args.registry)
+    if not len(registry):
+        sys.exit(f'no strokes found in {args.registry}')
+    broken_pairs = registry.dangling_pairs()
+    report = validate([Path(p) for p in args.outlines], registry, args.workers)
+    summary = report.summary(registry)
+    print(format_summary(summary, broken_pairs))
+    if args.json:
+        summary['broken_pairs'] = broken_pairs
+        tmp = args.json + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+        os.replace(tmp, args.json)
+    sys.exit(1 if summary['unknown_ids'] or broken_pairs else 0)
@@ -0,0 +1,273 @@
+"""
+Array-backed batch front end for the deterministic rule engine.
+
+Converting a large lexicon one word at a time spends most of its time on
+per-token normalisation (upper/strip/stress digits) and dict lookups.
+This module interns phoneme tokens to small integer codes once, maps them
+through a precomputed lookup array and returns CSR-style results: a flat
+array of stroke-id codes plus per-word offsets. String stroke ids are only
+materialised when a caller asks for them.
+
+Functions / classes:
+- StrokeTables(phoneme_to_stroke, vowel_markers): interned vocabularies
+  and the phoneme -> strokes lookup arrays
+- encode_phonemes(words, tables) -> (phoneme_codes, offsets)
+- phonemes_to_strokes_batch(words, tables) -> StrokeBatch
+- StrokeBatch.to_lists() -> List[List[str]]
+- StrokeBatch.packed() / StrokeBatch.positioned(i): position-annotated
+  tokens as packed ints or PositionedStroke records
+
+Output is identical to rule_engine_v2.phonemes_to_strokes applied word by
+word (including RAW_<PHONEME> tokens for unknown phonemes).
+"""
+
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.rule_engine import telemetry
+from src.rule_engine.rule_engine_v2 import (
+    PHONEME_TO_STROKE, POS_FINAL, POS_INITIAL, POS_MEDIAL, VOWEL_MARKERS, PositionedStroke,
+    normalize_phoneme,
+)
+
+CODE_DTYPE = np.int32
+# packed token layout: stroke code << POSITION_BITS | position code
+POSITION_BITS = 2
+
+
+class StrokeTables:
+    """Interned phoneme and stroke vocabularies plus a lookup array.
+
+    Phoneme code i maps to stroke codes
+    lookup_codes[lookup_offsets[i]:lookup_offsets[i + 1]].
+    Unknown phonemes are interned on first sight together with their
+    RAW_<PHONEME> stroke, so the tables only ever grow.
+    """
+
+    def __init__(self, phoneme_to_stroke: Optional[Dict[str, List[str]]] = None,
+                 vowel_markers: Optional[Dict[str, str]] = None):
+        self.phoneme_to_stroke = PHONEME_TO_STROKE if phoneme_to_stroke is None else phoneme_to_stroke
+        self.vowel_markers = VOWEL_MARKERS if vowel_markers is None else vowel_markers
+
+        self.phonemes: List[str] = []
+        self.phoneme_index: Dict[str, int] = {}
+        self.strokes: List[str] = []
+        self.stroke_index: Dict[str, int] = {}
+        # per-phoneme stroke code lists; flattened lazily into arrays
+        self._phoneme_strokes: List[List[int]] = []
+        # raw token (e.g. 'ah0 ') -> phoneme code, skips re-normalising
+        self._token_cache: Dict[str, int] = {}
+        self._lookup: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+        for p in self.phoneme_to_stroke:
+            self._intern_phoneme(p)
+        for p in self.vowel_markers:
+            self._intern_phoneme(p)
+
+    def stroke_code(self, stroke: str) -> int:
+        code = self.stroke_index.get(stroke)
+        if code is None:
+            code = len(self.strokes)
+            self.strokes.append(stroke)
+            self.stroke_index[stroke] = code
+        return code
+
+    def _intern_phoneme(self, p_upper: str) -> int:
+        code = self.phoneme_index.get(p_upper)
+        if code is not None:
+            return code
+
+        if p_upper in self.phoneme_to_stroke:
+            ids = self.phoneme_to_stroke[p_upper]
+        elif p_upper in self.vowel_markers:
+            ids = [self.vowel_markers[p_upper]]
+        else:
+            ids = [f'RAW_{p_upper}']
+
+        code = len(self.phonemes)
+        self.phonemes.append(p_upper)
+        self.phoneme_index[p_upper] = code
+        self._phoneme_strokes.append([self.stroke_code(s) for s in ids])
+        self._lookup = None
+        return code
+
+    def intern_rule(self, pattern: Sequence[str], strokes: Sequence[str]) -> int:
+        """Intern a multi-phoneme rule as a pseudo-phoneme ('S+T') whose
+        lookup entry is the rule's stroke list. Used by rule_automaton.
+        """
+        name = '+'.join(pattern)
+        code = self.phoneme_index.get(name)
+        if code is None:
+            code = len(self.phonemes)
+            self.phonemes.append(name)
+            self.phoneme_index[name] = code
+            self._phoneme_strokes.append([])
+        self._phoneme_strokes[code] = [self.stroke_code(s) for s in strokes]
+        self._lookup = None
+        return code
+
+    def phoneme_strokes(self, code: int) -> List[int]:
+        return self._phoneme_strokes[code]
+
+    def phoneme_code(self, token: str) -> int:
+        """Return the code for a raw phoneme token, interning if needed."""
+        code = self._token_cache.get(token)
+        if code is None:
+            code = self._intern_phoneme(normalize_phoneme(token))
+            self._token_cache[token] = code
+        return code
+
+    @property
+    def lookup(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(lookup_offsets, lookup_codes) arrays, rebuilt after growth."""
+        if self._lookup is None:
+            lengths = np.fromiter((len(s) for s in self._phoneme_strokes),
+                                  dtype=CODE_DTYPE, count=len(self._phoneme_strokes))
+            offsets = np.zeros(len(lengths) + 1, dtype=CODE_DTYPE)
+            np.cumsum(lengths, out=offsets[1:])
+            codes = np.fromiter((c for s in self._phoneme_strokes for c in s),
+                                dtype=CODE_DTYPE, count=int(offsets[-1]))
+            self._lookup = (offsets, codes)
+        return self._lookup
+
+    def decode_strokes(self, codes: Iterable[int]) -> List[str]:
+        strokes = self.strokes
+        return [strokes[c] for c in codes]
+
+
+_DEFAULT_TABLES: Optional[StrokeTables] = None
+
+
+def default_tables() -> StrokeTables:
+    """Shared tables built from rule_engine_v2's mapping."""
+    global _DEFAULT_TABLES
+    if _DEFAULT_TABLES is None:
+        _DEFAULT_TABLES = StrokeTables()
+    return _DEFAULT_TABLES
+
+
+class StrokeBatch:
+    """CSR result of a batch conversion.
+
+    Word i's strokes are codes[offsets[i]:offsets[i + 1]]; codes index
+    into tables.strokes. phoneme_index[j] is the position (within its word)
+    of the phoneme that produced stroke j and positions[j] its
+    initial/medial/final code (rule_engine_v2.POS_*).
+    """
+
+    __slots__ = ('codes', 'offsets', 'phoneme_index', 'positions', 'tables')
+
+    def __init__(self, codes: np.ndarray, offsets: np.ndarray,
+                 phoneme_index: np.ndarray, positions: np.ndarray, tables: StrokeTables):
+        self.codes = codes
+        self.offsets = offsets
+        self.phoneme_index = phoneme_index
+        self.positions = positions
+        self.tables = tables
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def word_codes(self, i: int) -> np.ndarray:
+        return self.codes[self.offsets[i]:self.offsets[i + 1]]
+
+    def word_strokes(self, i: int) -> List[str]:
+        return self.tables.decode_strokes(self.word_codes(i).tolist())
+
+    def packed(self) -> np.ndarray:
+        """Stroke and position codes packed into one int per token."""
+        return (self.codes << POSITION_BITS) | self.positions
+
+    def positioned(self, i: int) -> List[PositionedStroke]:
+        lo, hi = self.offsets[i], self.offsets[i + 1]
+        strokes = self.tables.strokes
+        return [PositionedStroke(strokes[c], p)
+                for c, p in zip(self.codes[lo:hi].tolist(), self.positions[lo:hi].tolist())]
+
+    def to_lists(self) -> List[List[str]]:
+        """Materialise string stroke ids for every word."""
+        strokes = self.tables.strokes
+        flat = [strokes[c] for c in self.codes.tolist()]
+        bounds = self.offsets.tolist()
+        return [flat[bounds[i]:bounds[i + 1]] for i in range(len(bounds) - 1)]
+
+
+def encode_phonemes(words: Iterable[Sequence[str]],
+                    tables: Optional[StrokeTables] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Encode phoneme lists as a flat code array plus per-word offsets."""
+    tables = tables or default_tables()
+    cache = tables._token_cache
+    code_of = tables.phoneme_code
+
+    flat: List[int] = []
+    bounds: List[int] = [0]
+    for phonemes in words:
+        for p in phonemes:
+            code = cache.get(p)
+            flat.append(code_of(p) if code is None else code)
+        bounds.append(len(flat))
+
+    return np.array(flat, dtype=CODE_DTYPE), np.array(bounds, dtype=np.int64)
+
+
+def strokes_from_codes(phoneme_codes: np.ndarray, phoneme_offsets: np.ndarray,
+                       tables: Optional[StrokeTables] = None,
+                       phoneme_positions: Optional[np.ndarray] = None) -> StrokeBatch:
+    """Map already-encoded phonemes through the lookup array.
+
+    phoneme_positions overrides the within-word position recorded for each
+    phoneme (used when a rewrite pass has merged phonemes into rules).
+    """
+    tables = tables or default_tables()
+    lookup_offsets, lookup_codes = tables.lookup
+
+    starts = lookup_offsets[phoneme_codes]
+    lengths = lookup_offsets[phoneme_codes + 1] - starts
+    total = int(lengths.sum())
+
+    # gather: for every output stroke, index of its source phoneme and the
+    # position inside that phoneme's stroke list
+    src = np.repeat(np.arange(len(phoneme_codes)), lengths)
+    out_starts = np.cumsum(lengths) - lengths
+    within = np.arange(total) - np.repeat(out_starts, lengths)
+    codes = lookup_codes[starts[src] + within] if total else np.zeros(0, dtype=CODE_DTYPE)
+
+    # per-word stroke offsets from per-phoneme lengths
+    cum = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=cum[1:])
+    offsets = cum[phoneme_offsets]
+
+    # index of each phoneme within its word, and initial/medial/final code
+    # (same rule as rule_engine_v2.position_code)
+    counts = np.diff(phoneme_offsets)
+    word_of_phoneme = np.repeat(np.arange(len(counts)), counts)
+    local = np.arange(len(phoneme_codes)) - phoneme_offsets[word_of_phoneme]
+    position = np.full(len(phoneme_codes), POS_MEDIAL, dtype=CODE_DTYPE)
+    position[local == counts[word_of_phoneme] - 1] = POS_FINAL
+    position[local == 0] = POS_INITIAL
+
+    phoneme_pos = local if phoneme_positions is None else phoneme_positions
+    phoneme_index = phoneme_pos[src].astype(CODE_DTYPE)
+
+    return StrokeBatch(codes.astype(CODE_DTYPE, copy=False), offsets,
+                       phoneme_index, position[src], tables)
+
+
+def phonemes_to_strokes_batch(words: Iterable[Sequence[str]],
+                              tables: Optional[StrokeTables] = None) -> StrokeBatch:
+    """Convert many phoneme lists at once. See module docstring."""
+    tables = tables or default_tables()
+    phoneme_codes, phoneme_offsets = encode_phonemes(words, tables)
+    if telemetry.ACTIVE is not None:
+        telemetry.ACTIVE.count_codes(phoneme_codes, tables.phonemes)
+    return strokes_from_codes(phoneme_codes, phoneme_offsets, tables)
+
+
+if __name__ == '__main__':
+    # quick smoke test
+    sample = [['P', 'EY1'], ['CH', 'EH1', 'R'], [], ['JH', 'AH1', 'JH']]
+    batch = phonemes_to_strokes_batch(sample)
+    print('Codes:', batch.codes.tolist())
+    print('Offsets:', batch.offsets.tolist())
+    print('Strokes:', batch.to_lists())
@@ -0,0 +1,152 @@
+"""
+Lexicon-constrained beam decoder from stroke candidates to words.
+
+Recognition yields several candidate strokes (with confidences) per
+position. Rather than scoring every combination, the decoder walks a
+lexicon trie built from the outline dataset and keeps only the
+`beam_width` best partial outlines at each position, so the cost per
+outline is bounded by positions x beam_width x candidates_per_position.
+At the last position every expansion that ends a complete outline is
+kept; these are scored with the summed log confidences plus a weighted
+word-frequency prior and the n best are returned.
+
+The prior is stored compactly as one float32 log-probability per lexicon
+word (add-one smoothed counts; uniform when no frequency file is given).
+
+Functions / classes:
+- LexiconTrie.from_index(index) -> LexiconTrie
+- load_frequencies(path) -> Dict[str, int]
+- BeamDecoder(trie, frequencies, prior_weight)
+- BeamDecoder.decode(candidates, beam_width, n_best) -> List[Hypothesis]
+"""
+
+import heapq
+import math
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.rule_engine.outline_index import OutlineIndex
+
+MIN_CONFIDENCE = 1e-6
+
+
+class Hypothesis(NamedTuple):
+    word: str
+    score: float
+    strokes: Tuple[str, ...]
+
+
+class LexiconTrie:
+    """Trie over stroke ids; terminal nodes point at word id ranges."""
+
+    def __init__(self):
+        self.children: List[Dict[str, int]] = [{}]
+        self.words: List[str] = []
+        # node -> (first word id, end word id) for complete outlines
+        self.terminal: Dict[int, Tuple[int, int]] = {}
+
+    def add(self, strokes: Sequence[str], words: Sequence[str]) -> None:
+        node = 0
+        for s in strokes:
+            nxt = self.children[node].get(s)
+            if nxt is None:
+                nxt = len(self.children)
+                self.children[node][s] = nxt
+                self.children.append({})
+            node = nxt
+        start = len(self.words)
+        self.words.extend(words)
+        self.terminal[node] = (start, len(self.words))
+
+    @classmethod
+    def from_index(cls, index: OutlineIndex) -> 'LexiconTrie':
+        trie = cls()
+        for i in range(len(index)):
+            trie.add(str(index.keys[i]).split(), index._words_at(i))
+        return trie
+
+
+def load_frequencies(path: Path) -> Dict[str, int]:
+    """Read 'word count' (or tab separated) lines; '#' lines are skipped."""
+    counts: Dict[str, int] = {}
+    with Path(path).open('r', encoding='utf-8') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and not parts[0].startswith('#'):
+                try:
+                    counts[parts[0].lower()] = counts.get(parts[0].lower(), 0) + int(float(parts[1]))
+                except ValueError:
+                    continue
+    return counts
+
+
+class BeamDecoder:
+    def __init__(self, trie: LexiconTrie, frequencies: Optional[Dict[str, int]] = None,
+                 prior_weight: float = 1.0):
+        self.trie = trie
+        self.prior_weight = prior_weight
+        counts = np.array([(frequencies or {}).get(w.lower(), 0) for w in trie.words],
+                          dtype=np.float64) + 1.0
+        self.log_prior = np.log(counts / counts.sum()).astype(np.float32)
+
+    def decode(self, candidates: Sequence[Sequence[Tuple[str, float]]],
+               beam_width: int = 16, n_best: int = 5,
+               max_candidates: int = 8) -> List[Hypothesis]:
+        """candidates[i] lists (stroke_id, confidence) options at position i."""
+        children = self.trie.children
+        # beam entries: (score, node, strokes)
+        beam: List[Tuple[float, int, Tuple[str, ...]]] = [(0.0, 0, ())]
+
+        last = len(candidates) - 1
+        for position, options in enumerate(candidates):
+            options = heapq.nlargest(max_candidates, options, key=lambda o: o[1])
+            expanded = []
+            for score, node, strokes in beam:
+                kids = children[node]
+                for stroke, conf in options:
+                    child = kids.get(stroke)
+                    if child is not None:
+                        expanded.append((score + math.log(max(conf, MIN_CONFIDENCE)),
+                                         child, strokes + (stroke,)))
+            if not expanded:
+                return []
+            # the last position is not pruned by path score: incomplete
+            # prefixes must not crowd out complete outlines, and the word
+            # prior has to take part in the final ranking
+            if position < last:
+                beam = heapq.nlargest(beam_width, expanded, key=lambda h: h[0])
+            else:
+                beam = expanded
+
+        results: List[Hypothesis] = []
+        for score, node, strokes in beam:
+            span = self.trie.terminal.get(node)
+            if span is None:
+                continue
+            for w in range(*span):
+                total = score + self.prior_weight * float(self.log_prior[w])
+                results.append(Hypothesis(self.trie.words[w], total, strokes))
+        return heapq.nlargest(n_best, results, key=lambda h: h.score)
+
+
+if __name__ == '__main__':
+    # regression: an incomplete higher-scoring prefix (A C) must not push
+    # the only complete outline (A B) out of a narrow beam
+    trie = LexiconTrie()
+    trie.add(['A', 'B'], ['ab'])
+    trie.add(['A', 'C', 'D'], ['acd'])
+    narrow = BeamDecoder(trie).decode([[('A', 1.0)], [('C', 0.6), ('B', 0.4)]], beam_width=1)
+    assert [h.word for h in narrow] == ['ab'], narrow
+
+    # quick smoke test against the bootstrap sample
+    from src.rule_engine.outline_index import load_or_build
+
+    decoder = BeamDecoder(LexiconTrie.from_index(load_or_build()))
+    candidates = [
+        [('U1_P_light', 0.6), ('U1_B_heavy', 0.4)],
+        [('V_EY', 0.9), ('V_IY', 0.1)],
+    ]
+    for hyp in decoder.decode(candidates):
+        print(f'{hyp.word}: {hyp.score:.3f} {list(hyp.strokes)}')
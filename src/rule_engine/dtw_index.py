@@ -0,0 +1,391 @@
+"""
+Dynamic time warping matcher with a lower-bound index over stroke templates.
+
+Templates and queries are normalised shapes (stroke_recognizer.prepare):
+N points resampled by arc length, centred and scaled. The DTW cost is the
+squared point distance, constrained to a Sakoe-Chiba band of +/- r points.
+Matching is exact (the same result as running DTW against every
+template); the index only avoids work:
+
+  1. Every template has an LB_Keogh envelope (running min / max of its
+     points over the band). The squared distance from the query to the
+     envelope lower-bounds the DTW cost.
+  2. Templates are clustered (k-means on their shapes, about sqrt(K)
+     clusters). A cluster's envelope is the union of its members'
+     envelopes, so it lower-bounds every member at once. Clusters are
+     visited in order of their bound and the search stops at the first
+     one whose bound cannot beat the current k-th best, so a query costs
+     about sqrt(K) cluster bounds plus the members of the few clusters
+     that are close to it.
+  3. Inside a cluster, members are visited in order of their own bound
+     with the same cut-off; survivors run DTW with early abandoning: a
+     row's minimum plus the envelope bound of the remaining rows already
+     exceeding the k-th best stops the computation.
+
+Distances are reported as the RMS distance of the matched points,
+sqrt(cost / N), in units of the normalised shape. Shapes only: light and
+heavy strokes of the same shape tie (StrokeRecognizer uses pressure).
+
+The index is built from the stroke registry (optionally plus whole-word
+outline templates) and saved as one npz. It records a stamp of the
+registry path data and settings (and of the ids and shapes of any extra
+templates); from_registry(cache_path=...) reloads it
+only while the stamp still matches and rebuilds it otherwise.
+
+Usage:
+  python -m src.rule_engine.dtw_index build --out data/dtw/registry.npz
+  python -m src.rule_engine.dtw_index bench --outlines data/outlines/bootstrap_sample.jsonl
+
+Functions / classes:
+- envelope(shapes, radius) -> (upper, lower) arrays
+- lb_keogh(query, upper, lower) -> np.ndarray (bounds per template)
+- dtw(a, b, radius, best) -> float (inf when abandoned)
+- templates_stamp(templates, base) -> str
+- outline_templates(entries, renderer, n) -> Dict[id, np.ndarray]
+- DTWIndex.build(templates, n, window) / .from_registry(...) / .load(path)
+- DTWIndex.query(points, k) -> List[DTWMatch]; DTWIndex.save(path)
+"""
+
+import hashlib
+import heapq
+import os
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.rule_engine.outline_render import OutlineRenderer, outline_place
+from src.rule_engine.rule_hash import outline_hash
+from src.rule_engine.stroke_geometry import GeometryCache, entry_path_data, path_hash, resample
+from src.rule_engine.stroke_recognizer import RESAMPLE_POINTS, normalize, prepare
+from src.rule_engine.stroke_registry import StrokeRegistry, load_registry
+
+DEFAULT_INDEX_PATH = Path('data/dtw/registry.npz')
+# Sakoe-Chiba band as a fraction of the sequence length
+DEFAULT_WINDOW = 0.1
+KMEANS_ITERATIONS = 10
+INDEX_VERSION = 1
+
+
+class DTWMatch(NamedTuple):
+    template_id: str
+    distance: float
+
+
+def envelope(shapes: np.ndarray, radius: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Running max / min of (..., N, 2) shapes over +/- radius points."""
+    pad = [(0, 0)] * (shapes.ndim - 2) + [(radius, radius), (0, 0)]
+    padded = np.pad(shapes, pad, mode='edge')
+    windows = np.lib.stride_tricks.sliding_window_view(padded, 2 * radius + 1, axis=-2)
+    return windows.max(axis=-1), windows.min(axis=-1)
+
+
+def _lb_terms(query: np.ndarray, upper: np.ndarray, lower: np.ndarray) -> np.ndarray:
+    """Per-point LB_Keogh terms: squared distance from each query point to
+    the envelope box, shape (..., N)."""
+    above = np.maximum(query - upper, 0.0)
+    below = np.maximum(lower - query, 0.0)
+    return (above * above + below * below).sum(axis=-1)
+
+
+def lb_keogh(query: np.ndarray, upper: np.ndarray, lower: np.ndarray) -> np.ndarray:
+    """LB_Keogh lower bound of the banded DTW cost for each envelope."""
+    return _lb_terms(query, upper, lower).sum(axis=-1)
+
+
+def dtw(a: np.ndarray, b: np.ndarray, radius: int, best: float = float('inf'),
+        tail: Optional[Sequence[float]] = None) -> float:
+    """Banded DTW cost between two (N, 2) shapes (squared point distance).
+
+    Returns inf as soon as the cost provably reaches `best`. `tail[i]`, if
+    given, is a lower bound on the cost of rows i..N-1 (LB_Keogh terms
+    summed from the end) and tightens the abandoning test.
+    """
+    inf = float('inf')
+    n, m = len(a), len(b)
+    cost = ((a[:, None, :] - b[None, :, :]) ** 2).sum(axis=-1).tolist()
+    # prev[j + 1] = D[i - 1][j]; prev[0] is the virtual D[-1][-1] = 0
+    prev = [0.0] + [inf] * m
+    for i in range(n):
+        row = cost[i]
+        cur = [inf] * (m + 1)
+        left = inf
+        row_min = inf
+        for j in range(max(0, i - radius), min(m, i + radius + 1)):
+            d = prev[j]
+            if prev[j + 1] < d:
+                d = prev[j + 1]
+            if left < d:
+                d = left
+            left = row[j] + d
+            cur[j + 1] = left
+            if left < row_min:
+                row_min = left
+        rest = tail[i + 1] if tail is not None and i + 1 < n else 0.0
+        if row_min + rest >= best:
+            return inf
+        prev = cur
+    return prev[m]
+
+
+def _kmeans(data: np.ndarray, k: int, iterations: int = KMEANS_ITERATIONS) -> np.ndarray:
+    """Cluster label per row; deterministic (farthest-point seeding)."""
+    centres = [0]
+    dist = ((data - data[0]) ** 2).sum(axis=1)
+    for _ in range(1, k):
+        centres.append(int(dist.argmax()))
+        dist = np.minimum(dist, ((data - data[centres[-1]]) ** 2).sum(axis=1))
+    centroids = data[centres]
+    labels = np.zeros(len(data), dtype=np.int64)
+    norms = (data * data).sum(axis=1)[:, None]
+    for iteration in range(iterations):
+        d2 = norms - 2 * data @ centroids.T + (centroids * centroids).sum(axis=1)[None]
+        new = d2.argmin(axis=1)
+        if iteration and np.array_equal(new, labels):
+            break
+        labels = new
+        for c in range(len(centroids)):
+            members = data[labels == c]
+            if len(members):
+                centroids[c] = members.mean(axis=0)
+    return labels
+
+
+def registry_stamp(registry: StrokeRegistry, n: int, radius: int) -> str:
+    """Hash of every stroke's path data plus the index settings."""
+    digest = hashlib.sha1(f'v{INDEX_VERSION} n={n} r={radius}'.encode('utf-8'))
+    for stroke_id in sorted(registry):
+        d = entry_path_data(registry.get(stroke_id))
+        if d:
+            digest.update(f'\n{stroke_id}={path_hash(d)}'.encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def templates_stamp(templates: Mapping[str, np.ndarray], base: str = '') -> str:
+    """Hash of template ids and shapes (float32 bytes), extending `base`."""
+    digest = hashlib.sha1(base.encode('utf-8'))
+    for template_id in sorted(templates):
+        shape = np.ascontiguousarray(templates[template_id], dtype=np.float32)
+        digest.update(f'\n{template_id}\0{shape.shape}\0'.encode('utf-8'))
+        digest.update(shape.tobytes())
+    return digest.hexdigest()[:16]
+
+
+def outline_templates(entries: Iterable[Dict], renderer: Optional[OutlineRenderer] = None,
+                      n: int = RESAMPLE_POINTS) -> Dict[str, np.ndarray]:
+    """Whole-outline templates (joined strokes, no vowels), one per
+    distinct outline, keyed by the first word seen for it. Further
+    outlines of the same word (--variants output) are keyed 'word#2',
+    'word#3', ..."""
+    renderer = renderer if renderer is not None else OutlineRenderer()
+    seen = set()
+    per_word: Counter = Counter()
+    templates: Dict[str, np.ndarray] = {}
+    for entry in entries:
+        strokes = entry['rule_outlines']
+        key = outline_hash(strokes)
+        if key in seen or renderer.missing(strokes):
+            continue
+        seen.add(key)
+        placed, _, _ = renderer.layout(strokes, outline_place(entry), vowels=False)
+        if not placed:
+            continue
+        word = entry['word']
+        per_word[word] += 1
+        template_id = word if per_word[word] == 1 else f'{word}#{per_word[word]}'
+        templates[template_id] = normalize(
+            resample([p.astype(np.float64) for p, _ in placed], n).astype(np.float64))
+    return templates
+
+
+class DTWIndex:
+    """Exact k-nearest-template search under banded DTW."""
+
+    def __init__(self, ids: Sequence[str], shapes: np.ndarray, radius: int,
+                 order: np.ndarray, offsets: np.ndarray, stamp: str = ''):
+        self.ids = tuple(ids)
+        self.shapes = np.asarray(shapes, dtype=np.float64)
+        self.n = self.shapes.shape[1]
+        self.radius = radius
+        self.stamp = stamp
+        # clusters as CSR: members of cluster c are order[offsets[c]:offsets[c + 1]]
+        self.order = order
+        self.offsets = offsets
+        self.upper, self.lower = envelope(self.shapes, radius)
+        self.cluster_upper = np.stack([self.upper[order[a:b]].max(axis=0)
+                                       for a, b in zip(offsets[:-1], offsets[1:])])
+        self.cluster_lower = np.stack([self.lower[order[a:b]].min(axis=0)
+                                       for a, b in zip(offsets[:-1], offsets[1:])])
+        self.stats = Counter()
+
+    @classmethod
+    def build(cls, templates: Mapping[str, np.ndarray], n: int = RESAMPLE_POINTS,
+              window: float = DEFAULT_WINDOW, clusters: Optional[int] = None,
+              stamp: str = '') -> 'DTWIndex':
+        """Index (n, 2) normalised shapes (resampled here if another length)."""
+        if not templates:
+            raise ValueError('no templates to index')
+        ids = list(templates)
+        shapes = []
+        for template_id in ids:
+            shape = np.asarray(templates[template_id], dtype=np.float64)
+            if len(shape) != n:
+                shape = normalize(resample([shape], n).astype(np.float64))
+            shapes.append(shape)
+        shapes = np.stack(shapes)
+        radius = max(1, int(round(window * n)))
+        k = clusters if clusters is not None else int(np.ceil(np.sqrt(len(ids))))
+        labels = _kmeans(shapes.reshape(len(ids), -1), min(max(k, 1), len(ids)))
+        # drop empty clusters; members keep template order inside a cluster
+        order = np.argsort(labels, kind='stable')
+        counts = np.bincount(labels)
+        offsets = np.concatenate([[0], np.cumsum(counts[counts > 0])])
+        return cls(ids, shapes, radius, order, offsets, stamp)
+
+    @classmethod
+    def from_registry(cls, registry: Optional[StrokeRegistry] = None,
+                      geometry: Optional[GeometryCache] = None, n: int = RESAMPLE_POINTS,
+                      window: float = DEFAULT_WINDOW,
+                      extra: Optional[Mapping[str, np.ndarray]] = None,
+                      cache_path: Optional[Path] = None) -> 'DTWIndex':
+        """Index every registry stroke with geometry (plus `extra` templates).
+        With cache_path, reuse the saved index while its stamp matches."""
+        registry = registry if registry is not None else load_registry()
+        geometry = geometry if geometry is not None else GeometryCache(n=n)
+        radius = max(1, int(round(window * n)))
+        stamp = registry_stamp(registry, n, radius)
+        if extra:
+            stamp = templates_stamp(extra, stamp)
+        if cache_path is not None and Path(cache_path).exists():
+            index = cls.load(cache_path)
+            if index.stamp == stamp:
+                return index
+        templates = {sid: normalize(points.astype(np.float64))
+                     for sid, points in geometry.registry_points(registry).items()}
+        templates.update(extra or {})
+        index = cls.build(templates, n, window, stamp=stamp)
+        if cache_path is not None:
+            index.save(cache_path)
+        return index
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def search(self, query: np.ndarray, k: int = 1) -> List[DTWMatch]:
+        """k nearest templates to a normalised (n, 2) query shape."""
+        stats = self.stats
+        stats['queries'] += 1
+        heap: List[Tuple[float, int]] = []  # (-cost, template), k best so far
+        best = float('inf')
+        cluster_lb = lb_keogh(query, self.cluster_upper, self.cluster_lower)
+        clusters = np.argsort(cluster_lb, kind='stable')
+        for rank, c in enumerate(clusters):
+            if cluster_lb[c] >= best:
+                stats['clusters_pruned'] += len(clusters) - rank
+                stats['templates_pruned'] += int(sum(self.offsets[cc + 1] - self.offsets[cc]
+                                                     for cc in clusters[rank:]))
+                break
+            members = self.order[self.offsets[c]:self.offsets[c + 1]]
+            terms = _lb_terms(query, self.upper[members], self.lower[members])
+            bounds = terms.sum(axis=1)
+            ranked = np.argsort(bounds, kind='stable')
+            for done, pos in enumerate(ranked):
+                if bounds[pos] >= best:
+                    stats['templates_pruned'] += len(ranked) - done
+                    break
+                tail = np.cumsum(terms[pos][::-1])[::-1].tolist()
+                template = int(members[pos])
+                cost = dtw(query, self.shapes[template], self.radius, best, tail)
+                if cost == float('inf'):
+                    stats['abandoned'] += 1
+                    continue
+                stats['dtw_full'] += 1
+                if len(heap) < k:
+                    heapq.heappush(heap, (-cost, template))
+                elif cost < -heap[0][0]:
+                    heapq.heapreplace(heap, (-cost, template))
+                if len(heap) == k:
+                    best = -heap[0][0]
+        ranked = sorted((-neg, t) for neg, t in heap)
+        return [DTWMatch(self.ids[t], float(np.sqrt(cost / self.n))) for cost, t in ranked]
+
+    def query(self, points: Sequence[Sequence[float]], k: int = 1) -> List[DTWMatch]:
+        """k nearest templates to a drawn (x, y[, t[, pressure]]) stroke."""
+        return self.search(prepare(points, self.n)[0], k)
+
+    def save(self, path: Path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # np.savez appends .npz when missing; write to a temp name then swap
+        tmp = path.with_name(path.stem + '.tmp.npz')
+        np.savez(tmp, ids=np.array(self.ids, dtype=str), shapes=self.shapes.astype(np.float32),
+                 radius=self.radius, order=self.order, offsets=self.offsets,
+                 stamp=self.stamp, version=INDEX_VERSION)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path) -> 'DTWIndex':
+        with np.load(path, allow_pickle=False) as data:
+            if int(data['version']) != INDEX_VERSION:
+                raise ValueError(f'{path}: index version {int(data["version"])}, '
+                                 f'expected {INDEX_VERSION}')
+            return cls(data['ids'].tolist(), data['shapes'], int(data['radius']),
+                       data['order'], data['offsets'], str(data['stamp']))
+
+
+if __name__ == '__main__':
+    import argparse
+    import json
+    import time
+
+    parser = argparse.ArgumentParser(description='Build or benchmark the DTW template index')
+    parser.add_argument('command', choices=('build', 'bench'))
+    parser.add_argument('--out', type=str, default=str(DEFAULT_INDEX_PATH))
+    parser.add_argument('--outlines', type=str, default=None,
+                        help='also index whole-word outlines from this JSONL file')
+    parser.add_argument('--limit', type=int, default=None, help='outline entries to read')
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('-k', type=int, default=1)
+    args = parser.parse_args()
+
+    extra = None
+    if args.outlines:
+        def entries():
+            with open(args.outlines, 'r', encoding='utf-8') as f:
+                for i, line in enumerate(f):
+                    if args.limit is not None and i >= args.limit:
+                        return
+                    if line.strip():
+                        yield json.loads(line)
+        extra = outline_templates(entries())
+
+    t0 = time.perf_counter()
+    if args.command == 'build':
+        index = DTWIndex.from_registry(extra=extra, cache_path=Path(args.out))
+        print(f'{len(index)} templates in {len(index.offsets) - 1} clusters '
+              f'(band +/-{index.radius}) -> {args.out} ({time.perf_counter() - t0:.2f}s)')
+    else:
+        index = DTWIndex.from_registry(extra=extra)
+        print(f'built {len(index)} templates in {len(index.offsets) - 1} clusters '
+              f'in {time.perf_counter() - t0:.2f}s')
+        rng = np.random.default_rng(0)
+        picks = rng.integers(0, len(index), args.queries)
+        queries = [normalize(index.shapes[i] + rng.normal(0, 0.02, index.shapes[i].shape))
+                   for i in picks]
+        t0 = time.perf_counter()
+        results = [index.search(q, args.k) for q in queries]
+        indexed = (time.perf_counter() - t0) / len(queries)
+        t0 = time.perf_counter()
+        brute = [sorted((dtw(q, s, index.radius), i) for i, s in enumerate(index.shapes))[:args.k]
+                 for q in queries]
+        exhaustive = (time.perf_counter() - t0) / len(queries)
+        agree = sum(np.allclose([m.distance for m in r], [np.sqrt(c / index.n) for c, _ in b])
+                    for r, b in zip(results, brute))
+        stats = index.stats
+        print(f'{args.queries} queries, k={args.k}: indexed {indexed * 1e3:.2f} ms, '
+              f'exhaustive {exhaustive * 1e3:.2f} ms per query; '
+              f'{agree}/{len(queries)} match the exhaustive result')
+        print(f"per query: {stats['dtw_full'] / stats['queries']:.1f} full DTW, "
+              f"{stats['abandoned'] / stats['queries']:.1f} abandoned, "
+              f"{stats['templates_pruned'] / stats['queries']:.1f} pruned by bounds")
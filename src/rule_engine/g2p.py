@@ -0,0 +1,142 @@
+"""
+Fast local letter-to-sound (LTS) fallback for out-of-vocabulary words.
+
+When CMUdict has no entry the bootstrap generator used to pass the word's
+letters straight to the rule engine, turning every OOV word into a stream
+of RAW_ tokens. This module guesses a plausible ARPAbet sequence instead.
+
+English spelling rules are written as (regex, phonemes, confidence)
+entries and compiled into one alternation; alternatives are ordered so
+longer and context-dependent graphemes win ('tch' before 'ch' before
+'c'). A word is scanned once, left to right. Each rule carries a
+confidence and the word's score is their product (roughly: how likely it
+is that every grapheme was read right), so long or irregular spellings
+are flagged as low confidence for human review. Results are
+memoised with an LRU cache.
+
+Stress follows CMUdict style: the first vowel gets '1', others '0'.
+
+Functions:
+- letter_to_sound(word) -> G2PResult(phonemes, confidence, low_confidence)
+"""
+
+import re
+from functools import lru_cache
+from typing import List, NamedTuple, Tuple
+
+LOW_CONFIDENCE = 0.3
+CACHE_SIZE = 1 << 16
+# letters no rule covers (e.g. non-ASCII) contribute this factor
+UNKNOWN_LETTER_CONFIDENCE = 0.2
+
+C = '[^aeiouy]'  # a consonant letter
+
+# (regex, phonemes, confidence). Order matters: earlier entries win.
+LTS_RULES: List[Tuple[str, str, float]] = [
+    # multi-letter consonants
+    ('tch', 'CH', 1.0), ('dge', 'JH', 0.95), ('sch', 'S K', 0.7),
+    ('ch', 'CH', 0.85), ('sh', 'SH', 1.0), ('ph', 'F', 1.0),
+    ('th', 'TH', 0.7), ('wh', 'W', 0.9), ('ck', 'K', 1.0),
+    ('ng', 'NG', 0.9), ('qu', 'K W', 0.9), ('^kn', 'N', 0.95),
+    ('^wr', 'R', 0.95), ('mb$', 'M', 0.9), ('gh(?=t)', '', 0.8),
+    ('tion', 'SH AH N', 0.95), ('sion', 'ZH AH N', 0.8),
+    ('ture', 'CH ER', 0.9), ('x', 'K S', 0.9),
+    # vowel teams
+    ('igh', 'AY', 0.95), ('eigh', 'EY', 0.9), ('ee', 'IY', 0.95),
+    ('ea', 'IY', 0.7), ('oo', 'UW', 0.7), ('ou', 'AW', 0.6),
+    ('ow$', 'OW', 0.6), ('ow', 'AW', 0.6), ('oi', 'OY', 0.95),
+    ('oy', 'OY', 0.95), ('ai', 'EY', 0.9), ('ay', 'EY', 0.95),
+    ('au', 'AO', 0.85), ('aw', 'AO', 0.9), ('ew', 'UW', 0.8),
+    ('ie$', 'AY', 0.6), ('ie', 'IY', 0.6), ('ei', 'IY', 0.5),
+    ('oa', 'OW', 0.9), ('ue$', 'UW', 0.8),
+    # r-coloured vowels
+    ('ar', 'AA R', 0.8), ('or', 'AO R', 0.8),
+    ('er', 'ER', 0.85), ('ir', 'ER', 0.85), ('ur', 'ER', 0.85),
+    # common endings
+    (f'(?<={C})le$', 'AH L', 0.85), ('(?<=[td])ed$', 'IH D', 0.8),
+    ('ed$', 'D', 0.6), ('ing$', 'IH NG', 0.95), ('es$', 'Z', 0.5),
+    # silent final e after a consonant (must precede magic-e vowels)
+    (f'(?<={C})e$', '', 0.85),
+    # magic e: vowel + consonant + final e
+    (f'a(?={C}e$)', 'EY', 0.75), (f'i(?={C}e$)', 'AY', 0.75),
+    (f'o(?={C}e$)', 'OW', 0.75), (f'u(?={C}e$)', 'UW', 0.7),
+    (f'e(?={C}e$)', 'IY', 0.7),
+    # y: consonant at start, vowel elsewhere
+    ('^y', 'Y', 0.9), (f'(?<={C})y$', 'IY', 0.7), ('y', 'IH', 0.5),
+    # soft c / g
+    ('c(?=[eiy])', 'S', 0.9), ('c', 'K', 0.9),
+    ('g(?=[eiy])', 'JH', 0.5), ('g', 'G', 0.85),
+    # s between vowels is usually voiced
+    ('(?<=[aeiou])s(?=[aeiou])', 'Z', 0.6),
+    # doubled consonants write one sound
+    ('bb', 'B', 1.0), ('dd', 'D', 1.0), ('ff', 'F', 1.0), ('ll', 'L', 1.0),
+    ('mm', 'M', 1.0), ('nn', 'N', 1.0), ('pp', 'P', 1.0), ('rr', 'R', 1.0),
+    ('ss', 'S', 1.0), ('tt', 'T', 1.0), ('zz', 'Z', 1.0),
+    # single vowels (short values)
+    ('a', 'AE', 0.6), ('e', 'EH', 0.6), ('i', 'IH', 0.6),
+    ('o', 'AA', 0.5), ('u', 'AH', 0.6),
+    # single consonants
+    ('b', 'B', 1.0), ('d', 'D', 1.0), ('f', 'F', 1.0), ('h', 'HH', 0.9),
+    ('j', 'JH', 1.0), ('k', 'K', 1.0), ('l', 'L', 1.0), ('m', 'M', 1.0),
+    ('n', 'N', 1.0), ('p', 'P', 1.0), ('r', 'R', 1.0), ('s', 'S', 0.9),
+    ('t', 'T', 1.0), ('v', 'V', 1.0), ('w', 'W', 0.9), ('z', 'Z', 1.0),
+]
+
+VOWEL_PHONEMES = frozenset(['AA', 'AE', 'AH', 'AO', 'AW', 'AY', 'EH', 'ER', 'EY',
+                            'IH', 'IY', 'OW', 'OY', 'UH', 'UW'])
+
+
+class G2PResult(NamedTuple):
+    phonemes: Tuple[str, ...]
+    confidence: float
+    low_confidence: bool
+
+
+def _compile(rules):
+    pattern = '|'.join(f'(?P<r{i}>{regex})' for i, (regex, _, _) in enumerate(rules))
+    outputs = [(tuple(phonemes.split()), conf) for _, phonemes, conf in rules]
+    return re.compile(pattern), outputs
+
+
+_PATTERN, _OUTPUTS = _compile(LTS_RULES)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def letter_to_sound(word: str) -> G2PResult:
+    """Guess an ARPAbet pronunciation for `word`."""
+    text = word.lower()
+    match = _PATTERN.match
+    phonemes: List[str] = []
+    confidence = 1.0
+    pos = 0
+    while pos < len(text):
+        m = match(text, pos)
+        if m is None:
+            # digits, apostrophes, hyphens...: skip; letters count against us
+            if text[pos].isalpha():
+                confidence *= UNKNOWN_LETTER_CONFIDENCE
+            pos += 1
+            continue
+        out, conf = _OUTPUTS[int(m.lastgroup[1:])]
+        phonemes.extend(out)
+        confidence *= conf
+        pos = m.end()
+
+    stressed = False
+    for i, p in enumerate(phonemes):
+        if p in VOWEL_PHONEMES:
+            phonemes[i] = p + ('0' if stressed else '1')
+            stressed = True
+
+    if not phonemes:
+        confidence = 0.0
+    confidence = round(confidence, 3)
+    return G2PResult(tuple(phonemes), confidence, confidence < LOW_CONFIDENCE)
+
+
+if __name__ == '__main__':
+    # quick smoke test
+    for w in ('blorch', 'snave', 'quibble', 'nation', 'knight', 'gyre', 'xylophone', "o'brien"):
+        r = letter_to_sound(w)
+        flag = ' (low confidence)' if r.low_confidence else ''
+        print(f'{w}: {" ".join(r.phonemes)} [{r.confidence}]{flag}')
@@ -0,0 +1,176 @@
+"""
+Bounded LRU cache for rule engine outlines.
+
+Dictation text is highly repetitive (the top few hundred words cover most
+tokens), so recomputing outlines per token is wasted work. OutlineCache
+memoises whole-word results keyed by the normalised phoneme tuple and the
+rule-table version, evicts least-recently-used entries past `capacity`
+and counts hits, misses, evictions and invalidations for sizing.
+
+The rule_engine_v2 tables are RuleTables, which record their own edits
+(rule_engine_v2.py), so every lookup compares a stamp of their identities
+and edit versions: any edit or rebinding is seen by the very next lookup
+and a stale hit is impossible. Only when the stamp moves is the content
+version recomputed; entries built against old tables are dropped if it
+changed. A table rebound to a plain dict is stamped by content instead
+(correct, but slower per lookup).
+
+Functions / classes:
+- rule_table_version(*tables) -> str
+- v2_table_stamp() -> tuple (identity and edit version of every table)
+- OutlineCache(capacity, version_fn, stamp_fn)
+- CachedRuleEngine(cache).phonemes_to_strokes(phonemes) -> List[str]
+- CachedRuleEngine(cache).positioned_strokes(phonemes) -> List[PositionedStroke]
+"""
+
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Sequence, Tuple
+
+from src.rule_engine import rule_engine_v2
+from src.rule_engine.batch import normalize_phoneme
+
+DEFAULT_CAPACITY = 4096
+
+
+def rule_table_version(*tables: Any) -> str:
+    """Short, stable fingerprint of one or more rule tables."""
+    blob = json.dumps(tables, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(blob.encode('utf-8')).hexdigest()[:12]
+
+
+def v2_table_version() -> str:
+    return rule_table_version(rule_engine_v2.PHONEME_TO_STROKE,
+                              rule_engine_v2.VOWEL_MARKERS,
+                              rule_engine_v2.POSITION_TOKENS)
+
+
+def _table_stamp(table: Dict) -> Tuple[int, Any]:
+    if isinstance(table, rule_engine_v2.RuleTable):
+        return id(table), table.version
+    return id(table), rule_table_version(table)
+
+
+def v2_table_stamp() -> Tuple[Tuple[int, Any], ...]:
+    return (_table_stamp(rule_engine_v2.PHONEME_TO_STROKE),
+            _table_stamp(rule_engine_v2.VOWEL_MARKERS),
+            _table_stamp(rule_engine_v2.POSITION_TOKENS))
+
+
+class OutlineCache:
+    """LRU mapping of (normalised phonemes, table version) -> outline.
+
+    stamp_fn must change whenever the tables may have (v2_table_stamp for
+    the default tables); without one, version_fn runs on every lookup.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY,
+                 version_fn: Callable[[], str] = v2_table_version,
+                 stamp_fn: Optional[Callable[[], Hashable]] = v2_table_stamp):
+        if capacity < 1:
+            raise ValueError('capacity must be >= 1')
+        self.capacity = capacity
+        self.version_fn = version_fn
+        self.version = version_fn()
+        self.stamp_fn = stamp_fn if stamp_fn is not None else version_fn
+        self._stamp = self.stamp_fn()
+        self._entries: 'OrderedDict[Hashable, Any]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def sync(self) -> bool:
+        """Re-check the rule-table version; clear the cache if it changed.
+        Returns True when entries were invalidated.
+        """
+        self._stamp = self.stamp_fn()
+        version = self.version_fn()
+        if version == self.version:
+            return False
+        self.version = version
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+        return True
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        if self.stamp_fn() != self._stamp:
+            self.sync()
+        full_key = (key, self.version)
+        entries = self._entries
+        value = entries.get(full_key)
+        if value is not None:
+            entries.move_to_end(full_key)
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        value = compute()
+        entries[full_key] = value
+        if len(entries) > self.capacity:
+            entries.popitem(last=False)
+            self.evictions += 1
+        return value
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'capacity': self.capacity,
+            'size': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'version': self.version,
+        }
+
+
+class CachedRuleEngine:
+    """rule_engine_v2 front end that memoises whole-word outlines."""
+
+    def __init__(self, cache: Optional[OutlineCache] = None):
+        self.cache = cache if cache is not None else OutlineCache()
+        # raw token -> normalised token, avoids re-normalising hot tokens
+        self._norm: Dict[str, str] = {}
+
+    def key(self, phonemes: Sequence[str]) -> Tuple[str, ...]:
+        norm = self._norm
+        out = []
+        for p in phonemes:
+            n = norm.get(p)
+            if n is None:
+                n = norm[p] = normalize_phoneme(p)
+            out.append(n)
+        return tuple(out)
+
+    def phonemes_to_strokes(self, phonemes: Sequence[str]) -> list:
+        key = self.key(phonemes)
+        strokes = self.cache.get_or_compute(
+            ('strokes', key), lambda: tuple(rule_engine_v2.phonemes_to_strokes(list(key))))
+        return list(strokes)
+
+    def positioned_strokes(self, phonemes: Sequence[str]) -> list:
+        """Cached rule_engine_v2.position_word (PositionedStroke records)."""
+        key = self.key(phonemes)
+        return list(self.cache.get_or_compute(
+            ('positioned', key), lambda: tuple(rule_engine_v2.position_word(key))))
+
+if __name__ == '__main__':
+    # quick smoke test
+    engine = CachedRuleEngine(OutlineCache(capacity=2))
+    for sample in (['P', 'EY1'], ['p', 'EY2'], ['CH', 'EH1', 'R'], ['T', 'IY1'], ['P', 'EY1']):
+        print(sample, '->', [str(t) for t in engine.positioned_strokes(sample)])
+    print(engine.cache.stats())
+    # table edits are picked up by the next lookup, without a sync()
+    rule_engine_v2.PHONEME_TO_STROKE['P'] = ['U1_B_heavy']
+    assert [str(t) for t in engine.positioned_strokes(['P', 'EY1'])][0] == 'POS_INITIAL|U1_B_heavy'
+    print('after editing a mapping:', engine.cache.stats())
+    rule_engine_v2.PHONEME_TO_STROKE['P'] = ['U1_P_light']
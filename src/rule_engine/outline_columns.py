@@ -0,0 +1,266 @@
+"""
+Columnar binary format for outline datasets.
+
+JSONL outlines repeat every key name and every stroke id string on each
+line. This format stores the same data as a directory of .npy columns:
+phoneme, stroke and source strings are interned once in vocab.json and
+each list-valued column is a CSR pair (codes + offsets). The reader opens
+the columns with np.load(mmap_mode='r'), so a job can slice the stroke
+codes of millions of outlines without parsing any JSON or loading the
+arrays into memory.
+
+Directory layout:
+  vocab.json                   {"phonemes": [...], "strokes": [...], "sources": [...], "count": n}
+  words.npy, word_offsets.npy  utf-8 blob + int64[n + 1]
+  phonemes.npy, phoneme_offsets.npy
+  strokes.npy, stroke_offsets.npy
+  sources.npy                  int16[n] code into vocab sources (-1: no source)
+  extras.npy, extra_offsets.npy  utf-8 JSON object of all remaining fields
+  layout.npy                   uint8[n]: LAYOUT_COLUMNS, or LAYOUT_JSON for
+                               entries that do not fit the columns (stored
+                               whole in extras)
+
+Conversion is lossless: entries come back as equal dicts with their key
+order, so re-serialising with json.dumps reproduces generator output
+byte for byte.
+
+Usage:
+  python -m src.rule_engine.outline_columns to-columns data/outlines/bootstrap_sample.jsonl \\
+      data/outlines/bootstrap_sample.columns
+  python -m src.rule_engine.outline_columns to-jsonl data/outlines/bootstrap_sample.columns out.jsonl
+
+Functions / classes:
+- ColumnWriter(path).append(entry) / .close() -> int
+- OutlineColumns(path): len, entry(i), word(i), phonemes(i), strokes(i),
+  word_stroke_codes(i), iteration; stroke_codes / stroke_offsets expose
+  the whole CSR column
+- jsonl_to_columns(jsonl_path, out_dir) -> int
+- columns_to_jsonl(columns_dir, out_path) -> int
+"""
+
+import json
+import os
+import shutil
+from array import array
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List
+
+import numpy as np
+
+LAYOUT_COLUMNS = 0
+LAYOUT_JSON = 1
+COLUMN_KEYS = ('word', 'phonemes', 'rule_outlines', 'source')
+VOCAB_FILE = 'vocab.json'
+
+
+def _is_str_list(value) -> bool:
+    return isinstance(value, list) and all(isinstance(v, str) for v in value)
+
+
+def _fits_columns(entry: Dict[str, Any]) -> bool:
+    """Standard generator entries: the column keys first, in order."""
+    keys = list(entry)[:len(COLUMN_KEYS)]
+    return (tuple(keys) == COLUMN_KEYS and isinstance(entry['word'], str)
+            and _is_str_list(entry['phonemes']) and _is_str_list(entry['rule_outlines'])
+            and isinstance(entry['source'], str))
+
+
+def _code_dtype(n: int):
+    return np.uint16 if n <= np.iinfo(np.uint16).max + 1 else np.int32
+
+
+class ColumnWriter:
+    """Streams entries into growable typed arrays; close() writes the
+    directory atomically (temp directory + rename).
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._vocab: Dict[str, Dict[str, int]] = {'phonemes': {}, 'strokes': {}, 'sources': {}}
+        self._words = bytearray()
+        self._word_offsets = array('q', [0])
+        self._phonemes = array('i')
+        self._phoneme_offsets = array('q', [0])
+        self._strokes = array('i')
+        self._stroke_offsets = array('q', [0])
+        self._sources = array('h')
+        self._extras = bytearray()
+        self._extra_offsets = array('q', [0])
+        self._layout = array('B')
+
+    def _intern(self, vocab: str, token: str) -> int:
+        table = self._vocab[vocab]
+        code = table.get(token)
+        if code is None:
+            code = table[token] = len(table)
+        return code
+
+    def append(self, entry: Dict[str, Any]) -> None:
+        word = entry.get('word')
+        if not isinstance(word, str):
+            raise ValueError(f'outline entry without a word: {entry!r}')
+        self._words += word.encode('utf-8')
+        self._word_offsets.append(len(self._words))
+
+        if _fits_columns(entry):
+            self._layout.append(LAYOUT_COLUMNS)
+            self._phonemes.extend(self._intern('phonemes', p) for p in entry['phonemes'])
+            self._strokes.extend(self._intern('strokes', s) for s in entry['rule_outlines'])
+            self._sources.append(self._intern('sources', entry['source']))
+            extras = {k: v for k, v in entry.items() if k not in COLUMN_KEYS}
+        else:
+            self._layout.append(LAYOUT_JSON)
+            self._sources.append(-1)
+            extras = entry
+        if extras:
+            self._extras += json.dumps(extras).encode('utf-8')
+        self._phoneme_offsets.append(len(self._phonemes))
+        self._stroke_offsets.append(len(self._strokes))
+        self._extra_offsets.append(len(self._extras))
+
+    def extend(self, entries: Iterable[Dict[str, Any]]) -> None:
+        for entry in entries:
+            self.append(entry)
+
+    def close(self) -> int:
+        """Write the columns; returns the number of entries."""
+        n = len(self._layout)
+        vocab = {name: list(table) for name, table in self._vocab.items()}
+        columns = {
+            'words': np.frombuffer(bytes(self._words), dtype=np.uint8),
+            'word_offsets': np.frombuffer(self._word_offsets, dtype=np.int64),
+            'phonemes': np.asarray(self._phonemes, dtype=_code_dtype(len(vocab['phonemes']))),
+            'phoneme_offsets': np.frombuffer(self._phoneme_offsets, dtype=np.int64),
+            'strokes': np.asarray(self._strokes, dtype=_code_dtype(len(vocab['strokes']))),
+            'stroke_offsets': np.frombuffer(self._stroke_offsets, dtype=np.int64),
+            'sources': np.frombuffer(self._sources, dtype=np.int16),
+            'extras': np.frombuffer(bytes(self._extras), dtype=np.uint8),
+            'extra_offsets': np.frombuffer(self._extra_offsets, dtype=np.int64),
+            'layout': np.frombuffer(self._layout, dtype=np.uint8),
+        }
+
+        tmp = self.path.with_name(self.path.name + '.tmp')
+        if tmp.exists():
+            shutil.rmtree(tmp)
+        tmp.mkdir(parents=True)
+        for name, values in columns.items():
+            np.save(tmp / f'{name}.npy', values)
+        vocab['count'] = n
+        (tmp / VOCAB_FILE).write_text(json.dumps(vocab), encoding='utf-8')
+        if self.path.exists():
+            shutil.rmtree(self.path)
+        os.replace(tmp, self.path)
+        return n
+
+
+class OutlineColumns:
+    """Memory-mapped reader over a column directory."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        vocab = json.loads((self.path / VOCAB_FILE).read_text(encoding='utf-8'))
+        self.phoneme_vocab: List[str] = vocab['phonemes']
+        self.stroke_vocab: List[str] = vocab['strokes']
+        self.source_vocab: List[str] = vocab['sources']
+        self._n = vocab['count']
+
+        def column(name):
+            return np.load(self.path / f'{name}.npy', mmap_mode='r')
+
+        self.words = column('words')
+        self.word_offsets = column('word_offsets')
+        self.phoneme_codes = column('phonemes')
+        self.phoneme_offsets = column('phoneme_offsets')
+        self.stroke_codes = column('strokes')
+        self.stroke_offsets = column('stroke_offsets')
+        self.sources = column('sources')
+        self.extras = column('extras')
+        self.extra_offsets = column('extra_offsets')
+        self.layout = column('layout')
+
+    def __len__(self) -> int:
+        return self._n
+
+    @staticmethod
+    def _span(offsets: np.ndarray, i: int):
+        return int(offsets[i]), int(offsets[i + 1])
+
+    def word(self, i: int) -> str:
+        lo, hi = self._span(self.word_offsets, i)
+        return self.words[lo:hi].tobytes().decode('utf-8')
+
+    def word_phoneme_codes(self, i: int) -> np.ndarray:
+        lo, hi = self._span(self.phoneme_offsets, i)
+        return self.phoneme_codes[lo:hi]
+
+    def word_stroke_codes(self, i: int) -> np.ndarray:
+        """Interned stroke codes of entry i (a view into the mmap)."""
+        lo, hi = self._span(self.stroke_offsets, i)
+        return self.stroke_codes[lo:hi]
+
+    def phonemes(self, i: int) -> List[str]:
+        vocab = self.phoneme_vocab
+        return [vocab[c] for c in self.word_phoneme_codes(i).tolist()]
+
+    def strokes(self, i: int) -> List[str]:
+        vocab = self.stroke_vocab
+        return [vocab[c] for c in self.word_stroke_codes(i).tolist()]
+
+    def _extras(self, i: int) -> Dict[str, Any]:
+        lo, hi = self._span(self.extra_offsets, i)
+        return json.loads(self.extras[lo:hi].tobytes()) if hi > lo else {}
+
+    def entry(self, i: int) -> Dict[str, Any]:
+        """Entry i as the original JSONL dict (same keys, same order)."""
+        if self.layout[i] == LAYOUT_JSON:
+            return self._extras(i)
+        entry = {
+            'word': self.word(i),
+            'phonemes': self.phonemes(i),
+            'rule_outlines': self.strokes(i),
+            'source': self.source_vocab[int(self.sources[i])],
+        }
+        entry.update(self._extras(i))
+        return entry
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for i in range(self._n):
+            yield self.entry(i)
+
+
+def jsonl_to_columns(jsonl_path: Path, out_dir: Path) -> int:
+    writer = ColumnWriter(out_dir)
+    with Path(jsonl_path).open('r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                writer.append(json.loads(line))
+    return writer.close()
+
+
+def columns_to_jsonl(columns_dir: Path, out_path: Path) -> int:
+    columns = OutlineColumns(columns_dir)
+    out_path = Path(out_path)
+    tmp = out_path.with_name(out_path.name + '.tmp')
+    with tmp.open('w', encoding='utf-8', buffering=1 << 20) as f:
+        for entry in columns:
+            f.write(json.dumps(entry) + '\n')
+    os.replace(tmp, out_path)
+    return len(columns)
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description='Convert outlines between JSONL and columns')
+    parser.add_argument('direction', choices=['to-columns', 'to-jsonl'])
+    parser.add_argument('src')
+    parser.add_argument('dst')
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    if args.direction == 'to-columns':
+        n = jsonl_to_columns(Path(args.src), Path(args.dst))
+    else:
+        n = columns_to_jsonl(Path(args.src), Path(args.dst))
+    print(f'Wrote {args.dst} ({n} entries, {time.perf_counter() - t0:.2f}s)')
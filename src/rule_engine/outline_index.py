@@ -0,0 +1,169 @@
+"""
+Reverse index from stroke-id sequences back to words.
+
+The inverse of phonemes_to_strokes for recognition and checking drills:
+given a stroke sequence, list every word in the outlines dataset
+(data/outlines/*.jsonl) whose rule outline matches it. Outlines are kept
+as sorted keys ('U1_P_light V_EY ') so exact lookups and prefix queries
+(partial outlines while the learner is still writing) are both binary
+searches. Prefixes only match whole stroke ids.
+
+The index is persisted as an uncompressed .npz of fixed-width string
+arrays, which loads in milliseconds; load_or_build() rebuilds it only when
+a source file's size or mtime has changed.
+
+Functions / classes:
+- OutlineIndex.build(paths) -> OutlineIndex
+- OutlineIndex.lookup(strokes) -> List[str]
+- OutlineIndex.complete(prefix, limit) -> List[Tuple[Tuple[str, ...], List[str]]]
+- OutlineIndex.save(path) / OutlineIndex.load(path)
+- load_or_build(paths, index_path) -> OutlineIndex
+"""
+
+import glob
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+SEP = ' '
+DEFAULT_OUTLINES_GLOB = 'data/outlines/*.jsonl'
+DEFAULT_INDEX_PATH = Path('data/outlines/outline_index.npz')
+
+
+def outline_key(strokes: Sequence[str]) -> str:
+    """Sortable key for a stroke sequence; a trailing separator makes
+    prefix matches stop at stroke-id boundaries.
+    """
+    return ''.join(s + SEP for s in strokes)
+
+
+def _source_stamp(paths: Sequence[Path]) -> np.ndarray:
+    return np.array([f'{p}|{p.stat().st_size}|{p.stat().st_mtime_ns}' for p in paths])
+
+
+class OutlineIndex:
+    """Sorted outline keys with CSR postings of words."""
+
+    def __init__(self, keys: np.ndarray, post_offsets: np.ndarray, words: np.ndarray,
+                 sources: Optional[np.ndarray] = None):
+        self.keys = keys
+        self.post_offsets = post_offsets
+        self.words = words
+        self.sources = sources if sources is not None else np.array([], dtype=str)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @classmethod
+    def from_entries(cls, entries: Iterable[Tuple[str, Sequence[str]]],
+                     sources: Optional[np.ndarray] = None) -> 'OutlineIndex':
+        """Build from (word, rule_outlines) pairs."""
+        postings: Dict[str, List[str]] = {}
+        for word, strokes in entries:
+            words = postings.setdefault(outline_key(strokes), [])
+            if word not in words:
+                words.append(word)
+
+        keys = sorted(postings)
+        offsets = np.zeros(len(keys) + 1, dtype=np.int64)
+        flat: List[str] = []
+        for i, key in enumerate(keys):
+            flat.extend(postings[key])
+            offsets[i + 1] = len(flat)
+        return cls(np.array(keys, dtype=str), offsets, np.array(flat, dtype=str), sources)
+
+    @classmethod
+    def build(cls, paths: Sequence[Path]) -> 'OutlineIndex':
+        """Build from outline JSONL files in one streaming pass each."""
+        paths = [Path(p) for p in paths]
+
+        def entries():
+            for path in paths:
+                with path.open('r', encoding='utf-8') as f:
+                    for line in f:
+                        if line.strip():
+                            entry = json.loads(line)
+                            yield entry['word'], entry['rule_outlines']
+
+        return cls.from_entries(entries(), _source_stamp(paths))
+
+    def _words_at(self, i: int) -> List[str]:
+        return self.words[self.post_offsets[i]:self.post_offsets[i + 1]].tolist()
+
+    def lookup(self, strokes: Sequence[str]) -> List[str]:
+        """Words whose outline is exactly `strokes`."""
+        key = outline_key(strokes)
+        i = int(np.searchsorted(self.keys, key))
+        if i < len(self.keys) and self.keys[i] == key:
+            return self._words_at(i)
+        return []
+
+    def prefix_range(self, prefix: Sequence[str]) -> Tuple[int, int]:
+        """[lo, hi) range of keys that start with the stroke prefix."""
+        key = outline_key(prefix)
+        lo = int(np.searchsorted(self.keys, key, side='left'))
+        hi = int(np.searchsorted(self.keys, key + '\U0010ffff', side='left'))
+        return lo, hi
+
+    def complete(self, prefix: Sequence[str],
+                 limit: Optional[int] = 20) -> List[Tuple[Tuple[str, ...], List[str]]]:
+        """Outlines (and their words) that extend the partial outline."""
+        lo, hi = self.prefix_range(prefix)
+        if limit is not None:
+            hi = min(hi, lo + limit)
+        return [(tuple(str(self.keys[i]).split()), self._words_at(i)) for i in range(lo, hi)]
+
+    def save(self, path: Path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # np.savez appends .npz when missing; write to a temp name then swap
+        tmp = path.with_name(path.name + '.tmp.npz')
+        np.savez(tmp, keys=self.keys, post_offsets=self.post_offsets,
+                 words=self.words, sources=self.sources)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path) -> 'OutlineIndex':
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data['keys'], data['post_offsets'], data['words'], data['sources'])
+
+
+def load_or_build(paths: Optional[Sequence[Path]] = None,
+                  index_path: Path = DEFAULT_INDEX_PATH) -> OutlineIndex:
+    """Load the persisted index, rebuilding it if any source changed."""
+    if paths is None:
+        paths = [Path(p) for p in sorted(glob.glob(DEFAULT_OUTLINES_GLOB))]
+    paths = [Path(p) for p in paths]
+    index_path = Path(index_path)
+
+    if index_path.exists():
+        index = OutlineIndex.load(index_path)
+        if index.sources.tolist() == _source_stamp(paths).tolist():
+            return index
+
+    index = OutlineIndex.build(paths)
+    index.save(index_path)
+    return index
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Build/query the outline reverse index')
+    parser.add_argument('--outlines', nargs='*', default=None,
+                        help=f'outline JSONL files (default: {DEFAULT_OUTLINES_GLOB})')
+    parser.add_argument('--index', type=str, default=str(DEFAULT_INDEX_PATH))
+    parser.add_argument('--lookup', nargs='*', default=None, help='exact stroke sequence')
+    parser.add_argument('--prefix', nargs='*', default=None, help='partial stroke sequence')
+    args = parser.parse_args()
+
+    index = load_or_build(args.outlines, Path(args.index))
+    print(f'{args.index}: {len(index)} outlines, {len(index.words)} words')
+    if args.lookup is not None:
+        print('lookup:', index.lookup(args.lookup))
+    if args.prefix is not None:
+        for strokes, words in index.complete(args.prefix):
+            print(' '.join(strokes), '->', words)
@@ -0,0 +1,180 @@
+"""
+Random access to outline JSONL files through a sidecar offset index.
+
+Looking up one word used to mean scanning the whole outlines file. The
+sidecar (<file>.offsets.npz) records the byte span of every entry plus
+the words sorted for binary search, built in one streaming pass that only
+decodes the "word" field of each line. The reader then serves point
+queries with a searchsorted and a single pread, and parses JSON only for
+the lines that are actually requested.
+
+The sidecar stores the source file's size and mtime; it is rebuilt
+automatically when they no longer match.
+
+Usage:
+  python -m src.rule_engine.outline_reader data/outlines/bootstrap_sample.jsonl --get pay bay
+
+Functions / classes:
+- build_offsets(jsonl_path, index_path) -> int (entries indexed)
+- OutlineReader(jsonl_path).get(word) -> dict or None
+- OutlineReader.get_all(word) -> List[dict] (duplicate entries, file order)
+- OutlineReader.line(word) -> bytes or None (raw, unparsed)
+- OutlineReader.iter_range(start, stop) -> entries by position in the file
+- OutlineReader.iter_word_range(lo, hi) -> entries with lo <= word < hi
+"""
+
+import json
+import os
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+
+# generator output starts every line with the word; anything else falls
+# back to a full json.loads
+_WORD_PREFIX = re.compile(rb'\{\s*"word"\s*:\s*("(?:[^"\\]|\\.)*")')
+
+
+def offsets_path(jsonl_path: Path) -> Path:
+    jsonl_path = Path(jsonl_path)
+    return jsonl_path.with_name(jsonl_path.name + '.offsets.npz')
+
+
+def _stamp(path: Path) -> np.ndarray:
+    st = path.stat()
+    return np.array([st.st_size, st.st_mtime_ns], dtype=np.int64)
+
+
+def _line_word(line: bytes) -> str:
+    m = _WORD_PREFIX.match(line)
+    if m:
+        return json.loads(m.group(1))
+    return json.loads(line)['word']
+
+
+def build_offsets(jsonl_path: Path, index_path: Optional[Path] = None) -> int:
+    """Index every non-blank line of `jsonl_path` in one streaming pass."""
+    jsonl_path = Path(jsonl_path)
+    index_path = Path(index_path) if index_path is not None else offsets_path(jsonl_path)
+    stamp = _stamp(jsonl_path)
+    words: List[str] = []
+    starts: List[int] = []
+    ends: List[int] = []
+    pos = 0
+    with jsonl_path.open('rb') as f:
+        for line in f:
+            if line.strip():
+                words.append(_line_word(line))
+                starts.append(pos)
+                ends.append(pos + len(line))
+            pos += len(line)
+
+    words_arr = np.array(words, dtype=str)
+    # stable sort: among duplicate words the earliest line comes first
+    order = np.argsort(words_arr, kind='stable').astype(np.int64)
+    index_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = index_path.with_name(index_path.name + '.tmp.npz')
+    np.savez(tmp, sorted_words=words_arr[order], order=order,
+             starts=np.array(starts, dtype=np.int64), ends=np.array(ends, dtype=np.int64),
+             stamp=stamp)
+    os.replace(tmp, index_path)
+    return len(words)
+
+
+class OutlineReader:
+    """Point and range queries over an outline JSONL file."""
+
+    def __init__(self, jsonl_path: Path, index_path: Optional[Path] = None):
+        self.path = Path(jsonl_path)
+        self.index_path = Path(index_path) if index_path is not None else offsets_path(self.path)
+        if not self._load():
+            build_offsets(self.path, self.index_path)
+            self._load()
+        self._fd = os.open(self.path, os.O_RDONLY)
+
+    def _load(self) -> bool:
+        if not self.index_path.exists():
+            return False
+        with np.load(self.index_path, allow_pickle=False) as data:
+            if not np.array_equal(data['stamp'], _stamp(self.path)):
+                return False
+            self.sorted_words = data['sorted_words']
+            self.order = data['order']
+            self.starts = data['starts']
+            self.ends = data['ends']
+        return True
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def close(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self) -> 'OutlineReader':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _read(self, i: int) -> bytes:
+        """Raw bytes of the i-th entry in file order."""
+        start = int(self.starts[i])
+        return os.pread(self._fd, int(self.ends[i]) - start, start)
+
+    def _span(self, word: str):
+        lo = int(np.searchsorted(self.sorted_words, word, side='left'))
+        hi = int(np.searchsorted(self.sorted_words, word, side='right'))
+        return lo, hi
+
+    def line(self, word: str) -> Optional[bytes]:
+        lo, hi = self._span(word)
+        return self._read(int(self.order[lo])) if hi > lo else None
+
+    def get(self, word: str) -> Optional[Dict[str, Any]]:
+        """First entry for `word` (in file order), or None."""
+        raw = self.line(word)
+        return json.loads(raw) if raw is not None else None
+
+    def get_all(self, word: str) -> List[Dict[str, Any]]:
+        lo, hi = self._span(word)
+        return [json.loads(self._read(int(i))) for i in self.order[lo:hi]]
+
+    def __contains__(self, word: str) -> bool:
+        lo, hi = self._span(word)
+        return hi > lo
+
+    def iter_range(self, start: int = 0, stop: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """Entries start..stop-1 in file order."""
+        stop = len(self) if stop is None else min(stop, len(self))
+        for i in range(max(start, 0), stop):
+            yield json.loads(self._read(i))
+
+    def iter_word_range(self, lo: str, hi: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Entries with lo <= word < hi, in word order."""
+        first = int(np.searchsorted(self.sorted_words, lo, side='left'))
+        last = (len(self) if hi is None
+                else int(np.searchsorted(self.sorted_words, hi, side='left')))
+        for i in self.order[first:last]:
+            yield json.loads(self._read(int(i)))
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Build/query the outline offset index')
+    parser.add_argument('outlines', help='outline JSONL file')
+    parser.add_argument('--get', nargs='*', default=[], help='words to look up')
+    parser.add_argument('--range', nargs=2, type=int, default=None, metavar=('START', 'STOP'),
+                        help='print entries by position in the file')
+    args = parser.parse_args()
+
+    with OutlineReader(Path(args.outlines)) as reader:
+        print(f'{reader.index_path}: {len(reader)} entries')
+        for word in args.get:
+            print(word, reader.get(word))
+        if args.range:
+            for entry in reader.iter_range(*args.range):
+                print(entry)
@@ -0,0 +1,272 @@
+"""
+Render whole-word outlines as SVG from their rule_outlines.
+
+Each stroke id is looked up in the stroke registry and turned into points
+by the geometry layer (stroke_geometry.py). Strokes are joined the way
+they are written: every stroke is translated so that it starts where the
+previous one ended. Heavy strokes are drawn thicker than light ones.
+
+Line position follows position writing (position_writing.py): the first
+vowel of the word puts the outline above, on or through the ruled line
+(the first stroke's lowest point sits a little above the line, on it, or
+the stroke is centred on it).
+
+Vowel markers (V_*) are drawn as dots beside the stroke they follow (the
+next stroke for a leading vowel). As in Pitman, the vowel's own place
+decides where along the stroke it sits: first place at the beginning,
+second in the middle, third at the end. Pass vowels=False to skip them.
+Tokens without geometry (RAW_*, unknown ids) are skipped and listed in
+the manifest as missing.
+
+Batch rendering caches by outline: identical stroke sequences written
+in the same place share one SVG file, named by a hash of the stroke ids,
+the place, the path data of every stroke (as GeometryCache keys it), the
+point resolution and RENDER_VERSION, and files that already exist are not
+rendered again. Editing a registry path or bumping RENDER_VERSION (do so
+whenever layout or drawing changes) therefore renders afresh. A manifest.jsonl maps
+every word to its file.
+
+Usage:
+  python -m src.rule_engine.outline_render data/outlines/bootstrap_sample.jsonl \\
+      --out data/renders
+
+Functions / classes:
+- OutlineRenderer(registry, geometry).render(strokes, place) -> RenderedOutline
+- OutlineRenderer.cache_key(strokes, place, vowels) -> str
+- render_outlines(entries, out_dir, renderer, vowels) -> dict (run stats)
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.rule_engine.position_writing import (
+    DEFAULT_PLACE, PLACE_FIRST, PLACE_THIRD, VOWEL_PLACES, first_vowel_place,
+)
+from src.rule_engine.rule_hash import outline_hash
+from src.rule_engine.stroke_geometry import GeometryCache, entry_path_data, path_hash
+from src.rule_engine.stroke_registry import StrokeRegistry, load_registry
+
+# bump when layout or drawing changes so cached SVGs are not reused
+RENDER_VERSION = 1
+LINE_Y = 0.0
+# gap between the line and an outline written above it
+ABOVE_GAP = 10.0
+MARGIN = 12.0
+LIGHT_WIDTH = 2.0
+HEAVY_WIDTH = 4.0
+VOWEL_OFFSET = 7.0
+VOWEL_RADIUS = 2.2
+# fraction along the stroke per vowel place (beginning / middle / end)
+VOWEL_ALONG = {1: 0.1, 2: 0.5, 3: 0.9}
+
+
+class RenderedOutline(NamedTuple):
+    svg: str
+    missing: Tuple[str, ...]
+
+
+def outline_place(entry: Dict) -> int:
+    """Line place of an outline entry: the 'place' the generator recorded
+    (position_writing.places_batch), else from its phonemes, else from its
+    vowel markers."""
+    place = entry.get('place')
+    if place:
+        return int(place)
+    phonemes = entry.get('phonemes') or [s[2:] for s in entry.get('rule_outlines', [])
+                                        if s.startswith('V_')]
+    return first_vowel_place(phonemes)
+
+
+def _fmt(points: np.ndarray) -> str:
+    return ' '.join(f'{x:.1f},{y:.1f}' for x, y in points.tolist())
+
+
+class OutlineRenderer:
+    def __init__(self, registry: Optional[StrokeRegistry] = None,
+                 geometry: Optional[GeometryCache] = None):
+        self.registry = registry if registry is not None else load_registry()
+        self.geometry = geometry if geometry is not None else GeometryCache()
+        self._strokes: Dict[str, Optional[Tuple[np.ndarray, bool]]] = {}
+        self._stamps: Dict[str, str] = {}
+
+    def stroke(self, stroke_id: str) -> Optional[Tuple[np.ndarray, bool]]:
+        """(points, heavy) for a stroke id, or None without geometry."""
+        if stroke_id in self._strokes:
+            return self._strokes[stroke_id]
+        points = self.geometry.stroke_points(stroke_id, self.registry)
+        stroke = None
+        if points is not None:
+            stroke = points, self.registry.get(stroke_id).get('weight') == 'heavy'
+        self._strokes[stroke_id] = stroke
+        return stroke
+
+    def path_stamp(self, stroke_id: str) -> str:
+        """Hash of a stroke's path data ('' without geometry)."""
+        stamp = self._stamps.get(stroke_id)
+        if stamp is None:
+            entry = self.registry.get(stroke_id)
+            d = entry_path_data(entry) if entry is not None else None
+            stamp = self._stamps[stroke_id] = path_hash(d) if d else ''
+        return stamp
+
+    def cache_key(self, strokes: Sequence[str], place: int, vowels: bool = True) -> str:
+        """Cache key of a rendered outline: stroke ids, place, vowels, the
+        path data of every stroke, point resolution and RENDER_VERSION."""
+        stamps = [f'PATH_{self.path_stamp(s)}' for s in strokes if not s.startswith('V_')]
+        return outline_hash(list(strokes) + [f'PLACE_{place}', f'VOWELS_{int(vowels)}',
+                                             f'N_{self.geometry.n}', f'RENDER_{RENDER_VERSION}']
+                            + stamps)
+
+    def missing(self, strokes: Sequence[str]) -> List[str]:
+        """Non-vowel tokens that cannot be drawn."""
+        return [s for s in strokes if not s.startswith('V_') and self.stroke(s) is None]
+
+    def layout(self, strokes: Sequence[str], place: int = DEFAULT_PLACE, vowels: bool = True):
+        """Joined stroke polylines, vowel dot centres and missing tokens,
+        in outline coordinates (ruled line at y = LINE_Y)."""
+        placed: List[Tuple[np.ndarray, bool]] = []
+        pending_vowels: List[str] = []
+        dots: List[Tuple[int, str]] = []  # (index of stroke, vowel)
+        missing: List[str] = []
+        pen = None
+        for token in strokes:
+            if token.startswith('V_'):
+                if vowels:
+                    if placed:
+                        dots.append((len(placed) - 1, token[2:]))
+                    else:
+                        pending_vowels.append(token[2:])
+                continue
+            stroke = self.stroke(token)
+            if stroke is None:
+                missing.append(token)
+                continue
+            points, heavy = stroke
+            # join: this stroke starts where the previous one ended
+            points = points - points[0] + (pen if pen is not None else 0.0)
+            pen = points[-1]
+            placed.append((points, heavy))
+            dots.extend((len(placed) - 1, v) for v in pending_vowels)
+            pending_vowels.clear()
+        if not placed:
+            return [], [], missing
+
+        first = placed[0][0]
+        if place == PLACE_FIRST:
+            shift = LINE_Y - ABOVE_GAP - first[:, 1].max()
+        elif place == PLACE_THIRD:
+            shift = LINE_Y - (first[:, 1].min() + first[:, 1].max()) / 2
+        else:
+            shift = LINE_Y - first[:, 1].max()
+        offset = np.array([-first[0, 0], shift], dtype=np.float32)
+        placed = [(points + offset, heavy) for points, heavy in placed]
+
+        centres = []
+        for index, vowel in dots:
+            points = placed[index][0]
+            at = VOWEL_ALONG.get(VOWEL_PLACES.get(vowel, DEFAULT_PLACE), 0.5)
+            i = min(int(round(at * (len(points) - 1))), len(points) - 2)
+            direction = points[i + 1] - points[i]
+            norm = float(np.hypot(*direction)) or 1.0
+            # left-hand normal of the writing direction
+            normal = np.array([direction[1], -direction[0]]) / norm
+            centres.append(points[i] + VOWEL_OFFSET * normal)
+        return placed, centres, missing
+
+    def render(self, strokes: Sequence[str], place: int = DEFAULT_PLACE,
+               vowels: bool = True, line: bool = True) -> RenderedOutline:
+        placed, centres, missing = self.layout(strokes, place, vowels)
+        all_points = [p for p, _ in placed]
+        if centres:
+            all_points.append(np.array(centres))
+        if all_points:
+            stacked = np.concatenate(all_points + [np.array([[0.0, LINE_Y]])])
+            lo = stacked.min(axis=0) - MARGIN
+            hi = stacked.max(axis=0) + MARGIN
+        else:
+            lo, hi = np.array([-MARGIN, LINE_Y - MARGIN]), np.array([MARGIN, LINE_Y + MARGIN])
+        width, height = hi - lo
+
+        parts = [f'<svg xmlns="http://www.w3.org/2000/svg" '
+                 f'viewBox="{lo[0]:.1f} {lo[1]:.1f} {width:.1f} {height:.1f}" '
+                 f'width="{width:.0f}" height="{height:.0f}">']
+        if line:
+            parts.append(f'<line x1="{lo[0]:.1f}" y1="{LINE_Y}" x2="{hi[0]:.1f}" y2="{LINE_Y}" '
+                         'stroke="#bbb" stroke-width="0.5"/>')
+        for points, heavy in placed:
+            parts.append(f'<polyline points="{_fmt(points)}" fill="none" stroke="black" '
+                         f'stroke-width="{HEAVY_WIDTH if heavy else LIGHT_WIDTH}" '
+                         'stroke-linecap="round" stroke-linejoin="round"/>')
+        for x, y in centres:
+            parts.append(f'<circle cx="{x:.1f}" cy="{y:.1f}" r="{VOWEL_RADIUS}" fill="black"/>')
+        parts.append('</svg>')
+        return RenderedOutline('\n'.join(parts) + '\n', tuple(missing))
+
+
+def render_outlines(entries: Iterable[Dict], out_dir: Path,
+                    renderer: Optional[OutlineRenderer] = None, vowels: bool = True) -> Dict:
+    """Render every entry's outline into out_dir/<outline hash>.svg (once
+    per distinct outline and place) and write out_dir/manifest.jsonl."""
+    renderer = renderer if renderer is not None else OutlineRenderer()
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    seen = set()
+    stats = {'entries': 0, 'rendered': 0, 'cached': 0, 'with_missing': 0}
+
+    manifest = out_dir / 'manifest.jsonl'
+    tmp_manifest = manifest.with_name(manifest.name + '.tmp')
+    with tmp_manifest.open('w', encoding='utf-8', buffering=1 << 20) as mf:
+        for entry in entries:
+            strokes = entry['rule_outlines']
+            place = outline_place(entry)
+            key = renderer.cache_key(strokes, place, vowels)
+            svg_path = out_dir / f'{key}.svg'
+            stats['entries'] += 1
+            missing = renderer.missing(strokes)
+            if key in seen or svg_path.exists():
+                stats['cached'] += 1
+            else:
+                rendered = renderer.render(strokes, place, vowels)
+                tmp = svg_path.with_name(svg_path.name + '.tmp')
+                tmp.write_text(rendered.svg, encoding='utf-8')
+                os.replace(tmp, svg_path)
+                stats['rendered'] += 1
+            seen.add(key)
+            if missing:
+                stats['with_missing'] += 1
+            mf.write(json.dumps({'word': entry['word'], 'outline_hash': key,
+                                 'svg': svg_path.name, 'place': place,
+                                 'missing': missing}) + '\n')
+    os.replace(tmp_manifest, manifest)
+    return stats
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description='Render outline SVGs for an outlines file')
+    parser.add_argument('outlines', help='outline JSONL file')
+    parser.add_argument('--out', type=str, default='data/renders')
+    parser.add_argument('--no-vowels', action='store_true', help='do not draw vowel dots')
+    parser.add_argument('--limit', type=int, default=None, help='render only the first N entries')
+    args = parser.parse_args()
+
+    def entries():
+        with open(args.outlines, 'r', encoding='utf-8') as f:
+            for i, line in enumerate(f):
+                if args.limit is not None and i >= args.limit:
+                    return
+                if line.strip():
+                    yield json.loads(line)
+
+    t0 = time.perf_counter()
+    stats = render_outlines(entries(), Path(args.out), vowels=not args.no_vowels)
+    elapsed = time.perf_counter() - t0
+    print(f"Rendered {stats['rendered']} outlines for {stats['entries']} entries "
+          f"({stats['cached']} cached, {stats['with_missing']} with missing strokes) "
+          f"in {elapsed:.2f}s -> {args.out}")
@@ -0,0 +1,209 @@
+"""
+Composable staged pipeline with bounded queues and an ordered sink.
+
+A pipeline is a source iterable, a list of Stages and a sink callable.
+Every item from the source is tagged with a sequence number and flows
+through the stages over bounded queues, so a slow stage applies
+backpressure instead of letting work pile up in memory. Each stage runs
+its function in one or more threads, or in a process pool (for CPU-bound
+Python work such as G2P); stages with several workers may finish items
+out of order. The sink runs in the calling thread and receives results
+strictly in source order (a small reorder buffer keyed by sequence
+number), so a single writer produces deterministic output.
+
+The first exception raised by any stage stops the pipeline and is
+re-raised from run_pipeline().
+
+Usage:
+    stages = [Stage('g2p', resolve, workers=4, kind='process'),
+              Stage('strokes', to_strokes)]
+    run_pipeline(iter_chunks(words, 1000), stages, out_f.write)
+
+Functions / classes:
+- Stage(name, fn, workers=1, kind='thread', initializer=None, initargs=())
+- run_pipeline(source, stages, sink, queue_size) -> int (items delivered)
+"""
+
+import queue
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Any, Callable, Iterable, List, NamedTuple, Optional, Tuple
+
+DEFAULT_QUEUE_SIZE = 8
+_POLL_SECONDS = 0.1
+_END = object()
+
+
+class Stage(NamedTuple):
+    name: str
+    fn: Callable[[Any], Any]
+    workers: int = 1
+    # 'thread' or 'process' (fn and items must then be picklable)
+    kind: str = 'thread'
+    # process stages: run once in every worker (e.g. to apply settings)
+    initializer: Optional[Callable] = None
+    initargs: Tuple = ()
+
+
+class _Stop(Exception):
+    """Raised inside pipeline threads once another stage has failed."""
+
+
+class _Run:
+    def __init__(self):
+        self.failed = threading.Event()
+        self.error: Optional[BaseException] = None
+        self._lock = threading.Lock()
+
+    def fail(self, exc: BaseException) -> None:
+        with self._lock:
+            if self.error is None:
+                self.error = exc
+        self.failed.set()
+
+    def put(self, q: queue.Queue, item) -> None:
+        while True:
+            if self.failed.is_set():
+                raise _Stop()
+            try:
+                q.put(item, timeout=_POLL_SECONDS)
+                return
+            except queue.Full:
+                continue
+
+    def get(self, q: queue.Queue):
+        while True:
+            if self.failed.is_set():
+                raise _Stop()
+            try:
+                return q.get(timeout=_POLL_SECONDS)
+            except queue.Empty:
+                continue
+
+
+def _guard(run: _Run, target: Callable, *args) -> Callable[[], None]:
+    def body():
+        try:
+            target(*args)
+        except _Stop:
+            pass
+        except BaseException as exc:  # surfaced by run_pipeline
+            run.fail(exc)
+    return body
+
+
+def _feed(run: _Run, source: Iterable, out_q: queue.Queue) -> None:
+    for seq, item in enumerate(source):
+        run.put(out_q, (seq, item))
+    run.put(out_q, _END)
+
+
+def _thread_stage(run: _Run, stage: Stage, in_q: queue.Queue, out_q: queue.Queue,
+                  remaining: List[int], lock: threading.Lock) -> None:
+    fn = stage.fn
+    while True:
+        msg = run.get(in_q)
+        if msg is _END:
+            # let sibling workers see the end too; the last one forwards it
+            run.put(in_q, _END)
+            with lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                run.put(out_q, _END)
+            return
+        seq, item = msg
+        run.put(out_q, (seq, fn(item)))
+
+
+def _process_stage(run: _Run, stage: Stage, in_q: queue.Queue, out_q: queue.Queue) -> None:
+    with ProcessPoolExecutor(max_workers=stage.workers, initializer=stage.initializer,
+                             initargs=stage.initargs) as pool:
+        pending = {}
+
+        def drain(block: bool) -> None:
+            nonlocal pending
+            if not pending:
+                return
+            done, _ = wait(pending, timeout=None if block else 0,
+                           return_when=FIRST_COMPLETED)
+            for future in done:
+                run.put(out_q, (pending.pop(future), future.result()))
+
+        while True:
+            msg = run.get(in_q)
+            if msg is _END:
+                break
+            seq, item = msg
+            pending[pool.submit(stage.fn, item)] = seq
+            # bound in-flight items so the pool does not buffer the input
+            while len(pending) >= stage.workers * 2:
+                drain(block=True)
+            drain(block=False)
+        while pending:
+            drain(block=True)
+    run.put(out_q, _END)
+
+
+def run_pipeline(source: Iterable, stages: List[Stage], sink: Callable[[Any], None],
+                 queue_size: int = DEFAULT_QUEUE_SIZE) -> int:
+    """Run `source` through `stages` and feed results to `sink` in order."""
+    run = _Run()
+    queues = [queue.Queue(maxsize=queue_size) for _ in range(len(stages) + 1)]
+    threads = [threading.Thread(target=_guard(run, _feed, run, source, queues[0]),
+                                name='pipeline-source', daemon=True)]
+    for i, stage in enumerate(stages):
+        in_q, out_q = queues[i], queues[i + 1]
+        if stage.kind == 'process':
+            threads.append(threading.Thread(
+                target=_guard(run, _process_stage, run, stage, in_q, out_q),
+                name=f'pipeline-{stage.name}', daemon=True))
+        elif stage.kind == 'thread':
+            remaining, lock = [stage.workers], threading.Lock()
+            threads.extend(threading.Thread(
+                target=_guard(run, _thread_stage, run, stage, in_q, out_q, remaining, lock),
+                name=f'pipeline-{stage.name}-{n}', daemon=True) for n in range(stage.workers))
+        else:
+            raise ValueError(f'stage {stage.name!r}: unknown kind {stage.kind!r}')
+    for t in threads:
+        t.start()
+
+    delivered = 0
+    held = {}
+    try:
+        while True:
+            msg = run.get(queues[-1])
+            if msg is _END:
+                break
+            seq, result = msg
+            held[seq] = result
+            while delivered in held:
+                sink(held.pop(delivered))
+                delivered += 1
+    except _Stop:
+        pass
+    except BaseException as exc:
+        run.fail(exc)
+    else:
+        # a finished pipeline must not leave anything in the reorder buffer
+        if held:
+            run.fail(RuntimeError(f'pipeline lost items before #{min(held)}'))
+    for t in threads:
+        t.join()
+    if run.error is not None:
+        raise run.error
+    return delivered
+
+
+if __name__ == '__main__':
+    # quick smoke test: results come back in source order
+    import random
+    import time
+
+    def jitter(x):
+        time.sleep(random.random() / 1000)
+        return x
+
+    out: List[int] = []
+    n = run_pipeline(range(200), [Stage('a', jitter, workers=4), Stage('b', abs)], out.append)
+    print(n, out == list(range(200)))
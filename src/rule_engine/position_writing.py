@@ -0,0 +1,113 @@
+"""
+Pitman position writing (first/second/third place) computed in bulk.
+
+The NCS rule (see EnhancedVowelCurriculum unit 3 and AuthenticVowelSystem):
+the first vowel sound of a word decides where the whole outline is written
+
+  first place  -> above the line
+  second place -> on the line
+  third place  -> through the line
+
+Words without a vowel sound are written on the line (second place).
+
+Vowel places follow the Pitman New Era / Anniversary assignment of the
+ARPAbet vowels:
+
+  first:  AA (ah, o), AE (a), AO (aw), AY (I), OY (oi)
+  second: EH (e), EY (ay), AH (u), OW (oh), ER
+  third:  IH (i), IY (ee), UH (oo), UW (oo), AW (ow)
+
+Functions:
+- first_vowel_place(phonemes) -> int (single word)
+- outline_places(phoneme_codes, phoneme_offsets, tables) -> np.ndarray
+- places_batch(words, tables) -> np.ndarray (one place per word)
+"""
+
+from typing import Dict, Iterable, Optional, Sequence
+
+import numpy as np
+
+from src.rule_engine.batch import StrokeTables, default_tables, encode_phonemes, normalize_phoneme
+
+PLACE_FIRST, PLACE_SECOND, PLACE_THIRD = 1, 2, 3
+
+LINE_POSITIONS = {
+    PLACE_FIRST: 'above',
+    PLACE_SECOND: 'on',
+    PLACE_THIRD: 'through',
+}
+
+VOWEL_PLACES: Dict[str, int] = {
+    'AA': PLACE_FIRST, 'AE': PLACE_FIRST, 'AO': PLACE_FIRST,
+    'AY': PLACE_FIRST, 'OY': PLACE_FIRST,
+    'EH': PLACE_SECOND, 'EY': PLACE_SECOND, 'AH': PLACE_SECOND,
+    'OW': PLACE_SECOND, 'ER': PLACE_SECOND,
+    'IH': PLACE_THIRD, 'IY': PLACE_THIRD, 'UH': PLACE_THIRD,
+    'UW': PLACE_THIRD, 'AW': PLACE_THIRD,
+}
+
+DEFAULT_PLACE = PLACE_SECOND
+
+
+def first_vowel_place(phonemes: Sequence[str]) -> int:
+    """Place of a single word's outline from its first vowel."""
+    for p in phonemes:
+        place = VOWEL_PLACES.get(normalize_phoneme(p))
+        if place:
+            return place
+    return DEFAULT_PLACE
+
+
+def _pattern_place(name: str) -> int:
+    # rule pseudo-phonemes are named 'S+T+ER'; use their first vowel
+    for part in name.split('+'):
+        place = VOWEL_PLACES.get(part)
+        if place:
+            return place
+    return 0
+
+
+def place_lookup(tables: StrokeTables) -> np.ndarray:
+    """Place per phoneme code (0 for consonants / unknown tokens)."""
+    return np.array([_pattern_place(p) for p in tables.phonemes], dtype=np.int8)
+
+
+def outline_places(phoneme_codes: np.ndarray, phoneme_offsets: np.ndarray,
+                   tables: Optional[StrokeTables] = None) -> np.ndarray:
+    """Vectorised first-vowel place for every word of an encoded batch."""
+    tables = tables or default_tables()
+    n = len(phoneme_codes)
+    per_phoneme = place_lookup(tables)[phoneme_codes]
+
+    # index of each vowel, n for everything else (plus a sentinel so that
+    # reduceat never indexes past the end for trailing empty words)
+    idx = np.where(per_phoneme > 0, np.arange(n), n)
+    idx = np.append(idx, n)
+    starts = phoneme_offsets[:-1]
+    first = np.minimum.reduceat(idx, starts)
+    # reduceat returns idx[start] for empty segments; treat them as no vowel
+    first[phoneme_offsets[1:] == starts] = n
+
+    places = np.full(len(starts), DEFAULT_PLACE, dtype=np.int8)
+    has_vowel = first < n
+    places[has_vowel] = per_phoneme[first[has_vowel]]
+    return places
+
+
+def places_batch(words: Iterable[Sequence[str]],
+                 tables: Optional[StrokeTables] = None) -> np.ndarray:
+    """Encode phoneme lists and return one place (1-3) per word."""
+    tables = tables or default_tables()
+    codes, offsets = encode_phonemes(words, tables)
+    return outline_places(codes, offsets, tables)
+
+
+if __name__ == '__main__':
+    # quick smoke test
+    samples = {
+        'pay': ['P', 'EY1'], 'father': ['F', 'AA1', 'DH', 'ER0'],
+        'tea': ['T', 'IY1'], 'ditch': ['D', 'IH1', 'CH'], 'cht': ['CH', 'T'],
+    }
+    places = places_batch(samples.values())
+    for word, place in zip(samples, places.tolist()):
+        print(f'{word}: place {place} ({LINE_POSITIONS[place]} the line)')
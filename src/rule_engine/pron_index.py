@@ -0,0 +1,235 @@
+"""
+Precompiled, memory-mapped pronunciation index.
+
+`pronouncing` parses the whole of CMUdict into Python objects on first use
+in every process. This module compiles the dictionary once into a compact
+binary file and reads it through mmap: cold start is a header parse,
+lookups are a binary search over sorted keys, and the data lives in the
+page cache instead of each process's heap. Building needs only a local
+CMUdict file (or the `cmudict` package data), never the network.
+
+File layout (little endian, sections 8-byte aligned, in this order):
+  header         MAGIC, n_words, n_prons, n_codes, symbols_len, keys_len
+  symbols        '\\n'-joined ARPAbet symbols (code i = i-th symbol)
+  key_offsets    uint32[n_words + 1] into keys
+  keys           sorted utf-8 words, concatenated
+  word_prons     uint32[n_words + 1]: word i owns prons [w[i], w[i + 1])
+  pron_offsets   uint32[n_prons + 1] into codes
+  codes          uint8[n_codes] interned phoneme codes
+
+Usage:
+  python -m src.rule_engine.pron_index --out data/pronunciations/cmudict.idx \\
+      [--cmudict path/to/cmudict.dict]
+
+Functions / classes:
+- iter_cmudict(lines) -> Iterator[(word, phonemes)]
+- build_index(entries, out_path) -> int (words written)
+- PronunciationIndex(path).pronunciations(word) -> List[List[str]]
+- PronunciationIndex(path).phones_for_word(word) -> List[str]
+"""
+
+import bisect
+import mmap
+import struct
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+import numpy as np
+
+MAGIC = b'PRONIDX1'
+HEADER = struct.Struct('<8s5Q')
+DEFAULT_INDEX_PATH = Path('data/pronunciations/cmudict.idx')
+FENCE_STRIDE = 64
+
+
+def _align(n: int) -> int:
+    return (n + 7) & ~7
+
+
+def iter_cmudict(lines: Iterable) -> Iterator[Tuple[str, List[str]]]:
+    """Parse CMUdict lines ('word(2) P EY1  # comment'); bytes or str."""
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode('utf-8', errors='replace')
+        line = line.split('#', 1)[0].strip()
+        if not line or line.startswith(';;;'):
+            continue
+        word, _, phones = line.partition(' ')
+        phonemes = phones.split()
+        if phonemes:
+            yield word.split('(', 1)[0].lower(), phonemes
+
+
+def default_cmudict_lines() -> Iterator[bytes]:
+    """CMUdict from the locally installed `cmudict` package (a dependency of
+    `pronouncing`); raises ImportError when it is not installed.
+    """
+    import cmudict
+
+    stream = cmudict.dict_stream()
+    try:
+        yield from stream
+    finally:
+        stream.close()
+
+
+def build_index(entries: Iterable[Tuple[str, List[str]]], out_path: Path) -> int:
+    """Compile (word, phonemes) pairs into the binary index. Multiple
+    pronunciations of a word keep their input order.
+    """
+    prons: Dict[str, List[List[str]]] = {}
+    for word, phonemes in entries:
+        prons.setdefault(word, []).append(phonemes)
+
+    symbols: Dict[str, int] = {}
+    for variants in prons.values():
+        for phonemes in variants:
+            for p in phonemes:
+                if p not in symbols:
+                    symbols[p] = len(symbols)
+    if len(symbols) > 256:
+        raise ValueError(f'{len(symbols)} phoneme symbols do not fit uint8 codes')
+
+    words = sorted(prons, key=lambda w: w.encode('utf-8'))
+    keys = bytearray()
+    key_offsets = [0]
+    word_prons = [0]
+    pron_offsets = [0]
+    codes = bytearray()
+    for w in words:
+        keys += w.encode('utf-8')
+        key_offsets.append(len(keys))
+        for phonemes in prons[w]:
+            codes += bytes(symbols[p] for p in phonemes)
+            pron_offsets.append(len(codes))
+        word_prons.append(len(pron_offsets) - 1)
+
+    symbol_blob = '\n'.join(symbols).encode('ascii')
+    sections = [
+        symbol_blob,
+        np.asarray(key_offsets, dtype='<u4').tobytes(),
+        bytes(keys),
+        np.asarray(word_prons, dtype='<u4').tobytes(),
+        np.asarray(pron_offsets, dtype='<u4').tobytes(),
+        bytes(codes),
+    ]
+
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out_path.with_name(out_path.name + '.tmp')
+    with tmp.open('wb') as f:
+        f.write(HEADER.pack(MAGIC, len(words), len(pron_offsets) - 1, len(codes),
+                            len(symbol_blob), len(keys)))
+        pos = HEADER.size
+        for section in sections:
+            pad = _align(pos) - pos
+            f.write(b'\0' * pad)
+            f.write(section)
+            pos += pad + len(section)
+    tmp.replace(out_path)
+    return len(words)
+
+
+class PronunciationIndex:
+    """Read-only view over a compiled index file (mmap, zero-copy arrays)."""
+
+    def __init__(self, path: Path = DEFAULT_INDEX_PATH):
+        self.path = Path(path)
+        with self.path.open('rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        mm = self._mm
+        magic, n_words, n_prons, n_codes, symbols_len, keys_len = HEADER.unpack_from(mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f'{self.path} is not a pronunciation index')
+
+        pos = _align(HEADER.size)
+        self.symbols = bytes(mm[pos:pos + symbols_len]).decode('ascii').split('\n')
+        pos = _align(pos + symbols_len)
+        self._key_offsets = np.frombuffer(mm, dtype='<u4', count=n_words + 1, offset=pos)
+        pos = _align(pos + 4 * (n_words + 1))
+        self._keys_start = pos
+        pos = _align(pos + keys_len)
+        self._word_prons = np.frombuffer(mm, dtype='<u4', count=n_words + 1, offset=pos)
+        pos = _align(pos + 4 * (n_words + 1))
+        self._pron_offsets = np.frombuffer(mm, dtype='<u4', count=n_prons + 1, offset=pos)
+        pos = _align(pos + 4 * (n_prons + 1))
+        self._codes = np.frombuffer(mm, dtype=np.uint8, count=n_codes, offset=pos)
+        self._n_words = n_words
+        # every FENCE_STRIDE-th key held in memory: bisect picks the block,
+        # then only a few mmap'd keys are compared
+        self._fences = [self._key(i) for i in range(0, n_words, FENCE_STRIDE)]
+
+    def __len__(self) -> int:
+        return self._n_words
+
+    def _key(self, i: int) -> bytes:
+        base = self._keys_start
+        return self._mm[base + int(self._key_offsets[i]):base + int(self._key_offsets[i + 1])]
+
+    def find(self, word: str) -> int:
+        """Index of `word` (lower-cased) or -1."""
+        target = word.lower().encode('utf-8')
+        block = bisect.bisect_right(self._fences, target) - 1
+        if block < 0:
+            return -1
+        lo = block * FENCE_STRIDE
+        hi = min(lo + FENCE_STRIDE, self._n_words)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self._n_words and self._key(lo) == target:
+            return lo
+        return -1
+
+    def __contains__(self, word: str) -> bool:
+        return self.find(word) >= 0
+
+    def pronunciations(self, word: str) -> List[List[str]]:
+        """Every pronunciation of `word` as ARPAbet token lists."""
+        i = self.find(word)
+        if i < 0:
+            return []
+        symbols = self.symbols
+        offsets = self._pron_offsets
+        out = []
+        for j in range(int(self._word_prons[i]), int(self._word_prons[i + 1])):
+            codes = self._codes[offsets[j]:offsets[j + 1]].tolist()
+            out.append([symbols[c] for c in codes])
+        return out
+
+    def phones_for_word(self, word: str) -> List[str]:
+        """Drop-in for pronouncing.phones_for_word (space-joined strings)."""
+        return [' '.join(p) for p in self.pronunciations(word)]
+
+    def close(self) -> None:
+        # release numpy views before the mapping they point into
+        self._key_offsets = self._word_prons = self._pron_offsets = self._codes = None
+        self._mm.close()
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description='Compile CMUdict into a mmap index')
+    parser.add_argument('--cmudict', type=str, default=None,
+                        help='CMUdict file (default: data from the cmudict package)')
+    parser.add_argument('--out', type=str, default=str(DEFAULT_INDEX_PATH))
+    parser.add_argument('--lookup', nargs='*', default=[], help='words to look up afterwards')
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    if args.cmudict:
+        with open(args.cmudict, 'rb') as f:
+            n = build_index(iter_cmudict(f), Path(args.out))
+    else:
+        n = build_index(iter_cmudict(default_cmudict_lines()), Path(args.out))
+    print(f'Wrote {args.out} ({n} words, {Path(args.out).stat().st_size:,} bytes, '
+          f'{time.perf_counter() - t0:.2f}s)')
+
+    index = PronunciationIndex(Path(args.out))
+    for word in args.lookup:
+        print(word, index.pronunciations(word))
@@ -0,0 +1,288 @@
+"""
+Rasterise outlines into labelled bitmaps for recogniser training.
+
+Outlines are laid out by OutlineRenderer (joined stroke geometry, line
+position, vowel dots). The points are then fitted into a fixed-size
+square and drawn with NumPy only: every stroke is resampled to a point
+each STAMP_STEP pixels, and an anti-aliased disc (the pen tip) is
+stamped at each point, max-blended over the small pixel window it
+covers. This keeps the cost proportional to ink length rather than
+pixels x segments. Heavy strokes are drawn wider than light ones.
+
+Augmentations are seeded per (seed, word, copy), so a dataset can be
+regenerated exactly:
+  slant       horizontal shear, as in forward or backward sloping hands
+  jitter      smooth per-point displacement (a wobbly pen)
+  pen width   global width factor; heavy strokes stay HEAVY_RATIO wider
+  scale/shift small changes of size and placement inside the frame
+
+build_dataset() splits the outlines into shards and renders them in a
+process pool. Each shard is written atomically as shard_NNNNN.npz with
+`images` (uint8, N x size x size), `labels` (index into the manifest's
+outline list) and `words`. manifest.json lists the shards, the label
+vocabulary (outline hash and stroke ids) and the settings used. Entries
+with tokens that cannot be drawn (RAW_*, unknown ids) are skipped.
+
+Usage:
+  python -m src.rule_engine.rasterize data/outlines/bootstrap_sample.jsonl \\
+      --out data/raster --size 64 --copies 4 --workers 4
+
+Functions / classes:
+- Augment(slant, jitter, width, scale) / Augment.sample(rng)
+- rasterize(strokes, dots, size, augment, rng) -> np.ndarray (size, size) uint8
+- build_dataset(entries, out_dir, ...) -> dict (manifest)
+"""
+
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.rule_engine.outline_render import OutlineRenderer, outline_place
+from src.rule_engine.rule_hash import outline_hash
+from src.rule_engine.stroke_geometry import GeometryCache
+
+DEFAULT_SIZE = 64
+DEFAULT_SHARD_SIZE = 2048
+# points per stroke for rasterising (straight and gently curved strokes
+# need far fewer than the renderer)
+RASTER_POINTS = 24
+PADDING = 0.12
+LIGHT_WIDTH = 1.6  # pixels at 64 x 64
+HEAVY_RATIO = 2.0
+DOT_RADIUS = 1.6
+# spacing of pen stamps along a stroke, in pixels
+STAMP_STEP = 0.5
+
+
+class Augment(NamedTuple):
+    """Maximum magnitude of each augmentation (0 disables it)."""
+    slant: float = 0.3      # shear factor
+    jitter: float = 0.02    # displacement, fraction of the outline size
+    width: float = 0.3      # pen width factor in [1 - width, 1 + width]
+    scale: float = 0.1      # size factor in [1 - scale, 1 + scale]
+
+    def sample(self, rng: np.random.Generator) -> Dict[str, float]:
+        return {
+            'slant': rng.uniform(-self.slant, self.slant),
+            'jitter': self.jitter,
+            'width': rng.uniform(1 - self.width, 1 + self.width),
+            'scale': rng.uniform(1 - self.scale, 1 + self.scale),
+            'dx': rng.uniform(-1, 1),
+            'dy': rng.uniform(-1, 1),
+        }
+
+
+NO_AUGMENT = Augment(0.0, 0.0, 0.0, 0.0)
+
+
+def _seed(*parts) -> int:
+    digest = hashlib.sha1('|'.join(map(str, parts)).encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'little')
+
+
+def _smooth_noise(rng: np.random.Generator, n: int, sigma: float) -> np.ndarray:
+    """Low-frequency 2-D displacement along a polyline of n points."""
+    knots = max(n // 8, 2)
+    coarse = rng.normal(0.0, sigma, size=(knots, 2))
+    x = np.linspace(0, knots - 1, n)
+    return np.stack([np.interp(x, np.arange(knots), coarse[:, k]) for k in range(2)], axis=1)
+
+
+def _densify(points: np.ndarray, step: float) -> np.ndarray:
+    """Resample a pixel-space polyline so consecutive points are at most
+    `step` pixels apart."""
+    seg = np.linalg.norm(np.diff(points, axis=0), axis=1)
+    dist = np.concatenate([[0.0], np.cumsum(seg)])
+    n = int(np.ceil(dist[-1] / step)) + 1
+    if n <= 1:
+        return points[:1]
+    targets = np.linspace(0.0, dist[-1], n)
+    return np.stack([np.interp(targets, dist, points[:, 0]),
+                     np.interp(targets, dist, points[:, 1])], axis=1)
+
+
+def _stamp(ink: np.ndarray, size: int, centres: np.ndarray, radii: np.ndarray) -> None:
+    """Max-blend anti-aliased discs into a flat size * size ink buffer,
+    touching only the pixel window around each disc."""
+    reach = int(np.ceil(radii.max() + 1.0))
+    span = np.arange(-reach, reach + 1)
+    oy, ox = np.meshgrid(span, span, indexing='ij')
+    base = np.floor(centres).astype(np.int64)
+    xs = base[:, 0, None] + ox.ravel()[None]
+    ys = base[:, 1, None] + oy.ravel()[None]
+    dist = np.hypot(xs + 0.5 - centres[:, 0, None], ys + 0.5 - centres[:, 1, None])
+    cover = np.clip(radii[:, None] - dist + 0.5, 0.0, 1.0)
+    keep = (cover > 0) & (xs >= 0) & (xs < size) & (ys >= 0) & (ys < size)
+    np.maximum.at(ink, ys[keep] * size + xs[keep], cover[keep])
+
+
+def rasterize(strokes: Sequence[Tuple[np.ndarray, bool]], dots: Sequence[np.ndarray] = (),
+              size: int = DEFAULT_SIZE, augment: Augment = NO_AUGMENT,
+              rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    """Draw (points, heavy) polylines and vowel dots into a size x size
+    uint8 image (255 = ink)."""
+    rng = rng if rng is not None else np.random.default_rng(0)
+    params = augment.sample(rng)
+    lines = [np.asarray(p, dtype=np.float64) for p, _ in strokes]
+    dots = np.asarray(dots, dtype=np.float64).reshape(-1, 2)
+
+    all_points = np.concatenate(lines + [dots]) if lines else dots
+    if len(all_points) == 0:
+        return np.zeros((size, size), dtype=np.uint8)
+    lo, hi = all_points.min(axis=0), all_points.max(axis=0)
+    centre = (lo + hi) / 2
+    extent = max(float((hi - lo).max()), 1e-6)
+
+    shear = np.array([[1.0, params['slant']], [0.0, 1.0]])
+    usable = size * (1 - 2 * PADDING)
+    factor = usable / extent * params['scale']
+    offset = size / 2 + np.array([params['dx'], params['dy']]) * size * PADDING / 2
+
+    def to_pixels(points):
+        return ((points - centre) @ shear.T) * factor + offset
+
+    pixel_scale = size / DEFAULT_SIZE * params['width']
+    centres, radii = [], []
+    for points, (_, heavy) in zip(lines, strokes):
+        if params['jitter']:
+            points = points + _smooth_noise(rng, len(points), params['jitter'] * extent)
+        px = _densify(to_pixels(points), STAMP_STEP)
+        centres.append(px)
+        radii.append(np.full(len(px), LIGHT_WIDTH * pixel_scale
+                             * (HEAVY_RATIO if heavy else 1.0) / 2))
+    if len(dots):
+        centres.append(to_pixels(dots))
+        radii.append(np.full(len(dots), DOT_RADIUS * pixel_scale))
+
+    ink = np.zeros(size * size)
+    _stamp(ink, size, np.concatenate(centres), np.concatenate(radii))
+    return (ink.reshape(size, size) * 255).astype(np.uint8)
+
+
+# process pool workers keep one renderer (registry + geometry) each
+_RENDERER: Optional[OutlineRenderer] = None
+
+
+def _renderer() -> OutlineRenderer:
+    global _RENDERER
+    if _RENDERER is None:
+        _RENDERER = OutlineRenderer(geometry=GeometryCache(n=RASTER_POINTS))
+    return _RENDERER
+
+
+def _shard_path(out_dir: Path, index: int) -> Path:
+    return out_dir / f'shard_{index:05d}.npz'
+
+
+def _render_shard(index: int, items: List[Tuple[str, List[str], int, int]], out_dir: Path,
+                  size: int, copies: int, augment: Augment, seed: int) -> Tuple[int, int]:
+    """Worker: rasterise (word, strokes, place, label) items into one shard."""
+    renderer = _renderer()
+    images, labels, words = [], [], []
+    for word, strokes, place, label in items:
+        placed, dots, _ = renderer.layout(strokes, place)
+        for copy in range(copies):
+            rng = np.random.default_rng(_seed(seed, word, label, copy))
+            # the first copy of every outline is the clean reference
+            aug = augment if copy else NO_AUGMENT
+            images.append(rasterize(placed, dots, size, aug, rng))
+            labels.append(label)
+            words.append(word)
+    final = _shard_path(out_dir, index)
+    # np.savez appends .npz when missing; write to a temp name then swap
+    tmp = final.with_name(final.stem + '.tmp.npz')
+    np.savez(tmp, images=np.stack(images) if images else np.zeros((0, size, size), np.uint8),
+             labels=np.array(labels, dtype=np.int32), words=np.array(words, dtype=str))
+    os.replace(tmp, final)
+    return index, len(images)
+
+
+def build_dataset(entries: Iterable[Dict], out_dir: Path, size: int = DEFAULT_SIZE,
+                  copies: int = 4, augment: Augment = Augment(), seed: int = 0,
+                  shard_size: int = DEFAULT_SHARD_SIZE, workers: int = 1) -> Dict:
+    """Rasterise every drawable entry `copies` times into sharded npz
+    files plus manifest.json; returns the manifest."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    renderer = _renderer()
+    label_index: Dict[str, int] = {}
+    outlines: List[Dict] = []
+    shards: List[List[Tuple[str, List[str], int, int]]] = [[]]
+    skipped = 0
+    for entry in entries:
+        strokes = entry['rule_outlines']
+        if renderer.missing(strokes) or not any(not s.startswith('V_') for s in strokes):
+            skipped += 1
+            continue
+        key = outline_hash(strokes)
+        label = label_index.get(key)
+        if label is None:
+            label = label_index[key] = len(outlines)
+            outlines.append({'outline_hash': key, 'strokes': list(strokes)})
+        if len(shards[-1]) * copies >= shard_size:
+            shards.append([])
+        shards[-1].append((entry['word'], list(strokes), outline_place(entry), label))
+    if not shards[-1]:
+        shards.pop()
+
+    args = [(i, items, out_dir, size, copies, augment, seed) for i, items in enumerate(shards)]
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            counts = dict(pool.map(_render_shard, *zip(*args))) if args else {}
+    else:
+        counts = dict(_render_shard(*a) for a in args)
+
+    manifest = {
+        'size': size,
+        'copies': copies,
+        'seed': seed,
+        'augment': augment._asdict(),
+        'images': sum(counts.values()),
+        'skipped_entries': skipped,
+        'shards': [{'file': _shard_path(out_dir, i).name, 'images': counts[i]}
+                   for i in range(len(shards))],
+        'outlines': outlines,
+    }
+    tmp = out_dir / 'manifest.json.tmp'
+    tmp.write_text(json.dumps(manifest), encoding='utf-8')
+    os.replace(tmp, out_dir / 'manifest.json')
+    return manifest
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description='Rasterise outlines into sharded npz images')
+    parser.add_argument('outlines', help='outline JSONL file')
+    parser.add_argument('--out', type=str, default='data/raster')
+    parser.add_argument('--size', type=int, default=DEFAULT_SIZE)
+    parser.add_argument('--copies', type=int, default=4,
+                        help='images per outline (first one unaugmented)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--shard-size', type=int, default=DEFAULT_SHARD_SIZE,
+                        help='images per shard')
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--limit', type=int, default=None)
+    args = parser.parse_args()
+
+    def entries():
+        with open(args.outlines, 'r', encoding='utf-8') as f:
+            for i, line in enumerate(f):
+                if args.limit is not None and i >= args.limit:
+                    return
+                if line.strip():
+                    yield json.loads(line)
+
+    t0 = time.perf_counter()
+    manifest = build_dataset(entries(), Path(args.out), args.size, args.copies,
+                             seed=args.seed, shard_size=args.shard_size, workers=args.workers)
+    elapsed = time.perf_counter() - t0
+    print(f"Wrote {manifest['images']} images in {len(manifest['shards'])} shards to {args.out} "
+          f"({manifest['images'] / elapsed:,.0f} images/s, "
+          f"{manifest['skipped_entries']} entries skipped)")
@@ -0,0 +1,270 @@
+"""
+Compiled longest-match rule automaton for multi-phoneme Pitman rules.
+
+PHONEME_TO_STROKE can only express one phoneme -> one stroke list. Hooks
+(PL/PR), loops (ST/STR), circles (NS) and halving/doubling all consume
+several phonemes at once, so they are written in a small rule DSL:
+
+    # pattern (ARPAbet, space separated) -> stroke ids
+    P L    -> U1_PL_hook
+    S T ER -> U2_STER_loop
+
+Rules are compiled into a trie over interned phoneme codes and applied in
+a single left-to-right pass with longest-match semantics: at each
+position the automaton walks as far as the trie allows and emits the
+longest rule that matched, otherwise the single-phoneme mapping (or a
+RAW_<PHONEME> token). The cost per word is bounded by the longest pattern,
+not by the number of rules.
+
+With telemetry enabled (telemetry.py), every applied rule is counted in
+rule_counts under its phoneme tuple, and phonemes mapped on their own in
+phoneme_counts; phonemes consumed by a rule are not counted again.
+
+Functions / classes:
+- parse_rules(text) -> Dict[Tuple[str, ...], List[str]]
+- RuleAutomaton(rules, tables)
+- RuleAutomaton.phonemes_to_strokes(phonemes) -> List[str]
+- RuleAutomaton.apply_batch(words) -> StrokeBatch
+- compile_rules(text) -> RuleAutomaton
+"""
+
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.rule_engine import telemetry
+from src.rule_engine.batch import (
+    StrokeBatch, StrokeTables, encode_phonemes, normalize_phoneme, strokes_from_codes,
+)
+from src.rule_engine.rule_engine_v2 import PHONEME_TO_STROKE, VOWEL_MARKERS
+
+# Seed cluster rules (hooks, loops, circles, halving/doubling). Stroke ids
+# follow the registry naming; extend as later units are encoded.
+PITMAN_CLUSTER_RULES = """
+# R and L hooks on straight strokes
+P R  -> U1_PR_hook
+B R  -> U1_BR_hook
+T R  -> U1_TR_hook
+D R  -> U1_DR_hook
+CH R -> U1_CHR_hook
+JH R -> U1_JR_hook
+P L  -> U1_PL_hook
+B L  -> U1_BL_hook
+K R  -> U3_KR_hook
+G R  -> U3_GR_hook
+K L  -> U3_KL_hook
+G L  -> U3_GL_hook
+
+# ST / STR loops
+S T    -> U2_ST_loop
+S T R  -> U2_STR_loop
+S T ER -> U2_STER_loop
+
+# NS circle
+N S -> U3_NS_circle
+N Z -> U3_NS_circle
+
+# halving adds T or D to a stroke
+P T -> U1_P_half
+B D -> U1_B_half
+K T -> U3_K_half
+G D -> U3_G_half
+
+# doubling adds -TER / -DER to curves
+F T ER -> U2_F_double
+V D ER -> U2_V_double
+"""
+
+
+def parse_rules(text: str) -> Dict[Tuple[str, ...], List[str]]:
+    """Parse the rule DSL. One rule per line: 'PAT ... -> STROKE ...'.
+    Blank lines and '#' comments are ignored.
+    """
+    rules: Dict[Tuple[str, ...], List[str]] = {}
+    for lineno, line in enumerate(text.splitlines(), 1):
+        line = line.split('#', 1)[0].strip()
+        if not line:
+            continue
+        if '->' not in line:
+            raise ValueError(f'rule line {lineno}: missing "->": {line!r}')
+        lhs, rhs = line.split('->', 1)
+        pattern = tuple(normalize_phoneme(p) for p in lhs.split())
+        strokes = rhs.split()
+        if not pattern or not strokes:
+            raise ValueError(f'rule line {lineno}: empty pattern or output: {line!r}')
+        rules[pattern] = strokes
+    return rules
+
+
+class RuleAutomaton:
+    """Trie of multi-phoneme rules over StrokeTables phoneme codes.
+
+    Single-phoneme rules belong in the StrokeTables mapping; compile_rules
+    folds them in before building the automaton.
+    """
+
+    def __init__(self, rules: Dict[Tuple[str, ...], List[str]],
+                 tables: Optional[StrokeTables] = None):
+        self.tables = tables or StrokeTables()
+        self.rules = rules
+        # trie states: transitions[state][phoneme_code] -> state; rule_code
+        # is the pseudo-phoneme emitted when a match ends at that state
+        self._next: List[Dict[int, int]] = [{}]
+        self._rule_code: List[int] = [-1]
+        self._rule_len: List[int] = [0]
+        # rule pseudo-phoneme code -> pattern, for telemetry
+        self.rule_patterns: Dict[int, Tuple[str, ...]] = {}
+        self.max_len = 0
+
+        for pattern, strokes in rules.items():
+            if len(pattern) < 2:
+                raise ValueError(f'single-phoneme rule {pattern} belongs in PHONEME_TO_STROKE')
+            state = 0
+            for p in pattern:
+                code = self.tables.phoneme_code(p)
+                nxt = self._next[state].get(code)
+                if nxt is None:
+                    nxt = len(self._next)
+                    self._next[state][code] = nxt
+                    self._next.append({})
+                    self._rule_code.append(-1)
+                    self._rule_len.append(0)
+                state = nxt
+            self._rule_code[state] = self.tables.intern_rule(pattern, strokes)
+            self.rule_patterns[self._rule_code[state]] = pattern
+            self._rule_len[state] = len(pattern)
+            self.max_len = max(self.max_len, len(pattern))
+
+        # first-two-phoneme filter: lets apply_batch skip words that cannot
+        # contain any multi-phoneme match without entering Python loops
+        n = len(self.tables.phonemes)
+        self._pair = np.zeros((n, n), dtype=bool)
+        for a, state in self._next[0].items():
+            for b in self._next[state]:
+                self._pair[a, b] = True
+
+    def _match(self, codes: Sequence[int], i: int) -> Tuple[int, int]:
+        """Longest rule starting at codes[i]: (rule_code, length) or (-1, 0)."""
+        best_code, best_len = -1, 0
+        state = 0
+        nxt = self._next
+        for j in range(i, min(len(codes), i + self.max_len)):
+            state = nxt[state].get(codes[j], -1)
+            if state < 0:
+                break
+            if self._rule_code[state] >= 0:
+                best_code, best_len = self._rule_code[state], self._rule_len[state]
+        return best_code, best_len
+
+    def encode_word(self, phonemes: Sequence[str]) -> List[int]:
+        """Rewrite a word into phoneme/rule codes in one longest-match pass."""
+        code_of = self.tables.phoneme_code
+        codes = [code_of(p) for p in phonemes]
+        out: List[int] = []
+        i = 0
+        while i < len(codes):
+            rule, length = self._match(codes, i)
+            if length:
+                out.append(rule)
+                i += length
+            else:
+                out.append(codes[i])
+                i += 1
+        return out
+
+    def phonemes_to_strokes(self, phonemes: Sequence[str]) -> List[str]:
+        """Drop-in replacement for rule_engine_v2.phonemes_to_strokes."""
+        tables = self.tables
+        strokes: List[str] = []
+        stats = telemetry.ACTIVE
+        for code in self.encode_word(phonemes):
+            if stats is not None:
+                pattern = self.rule_patterns.get(code)
+                if pattern is not None:
+                    stats.rule_counts[pattern] += 1
+                else:
+                    stats.phoneme_counts[tables.phonemes[code]] += 1
+            strokes.extend(tables.decode_strokes(tables.phoneme_strokes(code)))
+        return strokes
+
+    def rewrite_codes(self, phoneme_codes: np.ndarray,
+                      phoneme_offsets: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Apply rules to encoded phonemes.
+
+        Returns (codes, offsets, positions) where matched runs have been
+        collapsed into their rule's pseudo-phoneme code and positions holds
+        each remaining code's original index within its word.
+        """
+        n_codes = len(phoneme_codes)
+        codes = phoneme_codes.copy()
+        keep = np.ones(n_codes, dtype=bool)
+
+        if n_codes > 1:
+            a, b = phoneme_codes[:-1], phoneme_codes[1:]
+            n = self._pair.shape[0]
+            candidate = (a < n) & (b < n)
+            candidate[candidate] = self._pair[a[candidate], b[candidate]]
+            # pairs straddling a word boundary never match
+            ends = phoneme_offsets[1:-1] - 1
+            candidate[ends[(ends >= 0) & (ends < n_codes - 1)]] = False
+
+            starts = np.flatnonzero(candidate)
+            if len(starts):
+                words = np.unique(np.searchsorted(phoneme_offsets, starts, side='right') - 1)
+                flat = phoneme_codes.tolist()
+                bounds = phoneme_offsets.tolist()
+                for w in words.tolist():
+                    lo, hi = bounds[w], bounds[w + 1]
+                    word = flat[lo:hi]
+                    i = 0
+                    while i < len(word):
+                        rule, length = self._match(word, i)
+                        if length:
+                            codes[lo + i] = rule
+                            keep[lo + i + 1:lo + i + length] = False
+                            i += length
+                        else:
+                            i += 1
+
+        word_of = np.repeat(np.arange(len(phoneme_offsets) - 1), np.diff(phoneme_offsets))
+        positions = np.arange(n_codes) - phoneme_offsets[word_of]
+        kept = np.zeros(n_codes + 1, dtype=np.int64)
+        np.cumsum(keep, out=kept[1:])
+        return codes[keep], kept[phoneme_offsets], positions[keep]
+
+    def apply_batch(self, words: Iterable[Sequence[str]]) -> StrokeBatch:
+        """Batch conversion with rules, same CSR layout as batch.py."""
+        phoneme_codes, phoneme_offsets = encode_phonemes(words, self.tables)
+        codes, offsets, positions = self.rewrite_codes(phoneme_codes, phoneme_offsets)
+        if telemetry.ACTIVE is not None:
+            telemetry.ACTIVE.count_codes(codes, self.tables.phonemes, self.rule_patterns)
+        return strokes_from_codes(codes, offsets, self.tables, phoneme_positions=positions)
+
+
+def compile_rules(text: str = PITMAN_CLUSTER_RULES,
+                  phoneme_to_stroke: Optional[Dict[str, List[str]]] = None,
+                  vowel_markers: Optional[Dict[str, str]] = None) -> RuleAutomaton:
+    """Compile DSL text on top of the single-phoneme tables (rule_engine_v2
+    by default). Single-phoneme DSL lines override the base mapping.
+    """
+    rules = parse_rules(text)
+    base = dict(PHONEME_TO_STROKE if phoneme_to_stroke is None else phoneme_to_stroke)
+    multi: Dict[Tuple[str, ...], List[str]] = {}
+    for pattern, strokes in rules.items():
+        if len(pattern) == 1:
+            base[pattern[0]] = strokes
+        else:
+            multi[pattern] = strokes
+    tables = StrokeTables(base, VOWEL_MARKERS if vowel_markers is None else vowel_markers)
+    return RuleAutomaton(multi, tables)
+
+
+if __name__ == '__main__':
+    # quick smoke test
+    automaton = compile_rules()
+    for sample in (['P', 'L', 'EY1'], ['S', 'T', 'AA1', 'R'], ['M', 'AE1', 'S', 'T', 'ER0']):
+        print(sample, '->', automaton.phonemes_to_strokes(sample))
+    stats = telemetry.enable()
+    automaton.apply_batch([['P', 'L', 'EY1'], ['S', 'T', 'AA1', 'R'], ['N', 'OW1', 'Z']])
+    print(stats.format_summary(PHONEME_TO_STROKE, VOWEL_MARKERS, cluster_rules=automaton.rules))
+    telemetry.disable()
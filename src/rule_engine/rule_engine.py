@@ -14,6 +14,8 @@ simple vowel handling.
 
 from typing import List
 
+from src.rule_engine import telemetry
+
 # Minimal canonical stroke ids (Unit 1)
 PHONEME_TO_STROKE = {
     # plosives: P (unvoiced) -> U1_P_light, B (voiced) -> U1_B_heavy
@@ -42,6 +44,7 @@ def phonemes_to_strokes(phonemes: List[str]) -> List[str]:
     and intended to be extended as more units and rules are encoded.
     """
     strokes: List[str] = []
+    stats = telemetry.ACTIVE
 
     for p in phonemes:
         p_upper = p.upper().strip()
@@ -49,6 +52,8 @@ def phonemes_to_strokes(phonemes: List[str]) -> List[str]:
         # strip trailing digits
         if p_upper and p_upper[-1].isdigit():
             p_upper = p_upper[:-1]
+        if stats is not None:
+            stats.phoneme_counts[p_upper] += 1
 
         if p_upper in PHONEME_TO_STROKE:
             strokes.extend(PHONEME_TO_STROKE[p_upper])
@@ -3,12 +3,77 @@ Extended deterministic rule engine for Pitman shorthand (Units 1-3).
 Maps ARPAbet phoneme tokens to stroke token sequences and applies simple
 positioning (initial/medial/final) markers. Intended for bootstrapping
 training data and as a baseline generator.
+
+The tables are RuleTable dicts: every edit gives the table a new
+`version`, so caches over them (outline_cache.py) see edits on the very
+next lookup.
+Stroke lists are stored as tuples; replace an entry rather than mutating
+it in place (PHONEME_TO_STROKE['K'] = [...], not .append()).
 """
 
-from typing import List
+import itertools
+from typing import List, Sequence
+
+from src.rule_engine import telemetry
+
+# shared by all RuleTables, so (id, version) never repeats even when a
+# rebound table reuses a freed table's id
+_EDITS = itertools.count(1)
+
+
+class RuleTable(dict):
+    """dict that records its own edits: `version` takes a new value on
+    every change. List values are stored as tuples so an entry can only
+    change through the mapping."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self.update(*args, **kwargs)
+
+    def _edited(self):
+        self.version = next(_EDITS)
+
+    @staticmethod
+    def _freeze(value):
+        return tuple(value) if isinstance(value, list) else value
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, self._freeze(value))
+        self._edited()
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._edited()
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            super().__setitem__(key, self._freeze(value))
+        self._edited()
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def pop(self, key, *default):
+        self._edited()
+        return super().pop(key, *default)
+
+    def popitem(self):
+        self._edited()
+        return super().popitem()
+
+    def clear(self):
+        super().clear()
+        self._edited()
+
 
 # Extended canonical stroke ids (Units 1-3 sample)
-PHONEME_TO_STROKE = {
+PHONEME_TO_STROKE = RuleTable({
     # Unit 1 - straight strokes
     'P': ['U1_P_light'], 'B': ['U1_B_heavy'],
     'T': ['U1_T_light'], 'D': ['U1_D_heavy'],
@@ -20,20 +85,51 @@ PHONEME_TO_STROKE = {
     # Unit 3 - horizontals/velars and nasals
     'K': ['U3_K_light'], 'G': ['U3_G_heavy'],
     'M': ['U3_M_short'], 'N': ['U3_N_short'], 'NG': ['U3_NG_connect']
-}
+})
 
-VOWEL_MARKERS = {
+VOWEL_MARKERS = RuleTable({
     'AA': 'V_AA', 'AE': 'V_AE', 'AH': 'V_AH', 'AO': 'V_AO',
     'AW': 'V_AW', 'AY': 'V_AY', 'EH': 'V_EH', 'ER': 'V_ER',
     'EY': 'V_EY', 'IH': 'V_IH', 'IY': 'V_IY', 'OW': 'V_OW',
     'OY': 'V_OY', 'UH': 'V_UH', 'UW': 'V_UW'
-}
+})
 
-POSITION_TOKENS = {
+POSITION_TOKENS = RuleTable({
     'initial': 'POS_INITIAL',
     'medial': 'POS_MEDIAL',
     'final': 'POS_FINAL'
-}
+})
+
+# Position codes used by PositionedStroke and the batch API (2 bits)
+POSITION_ORDER = ('initial', 'medial', 'final')
+POS_INITIAL, POS_MEDIAL, POS_FINAL = range(3)
+
+class PositionedStroke:
+    """A stroke id tagged with its position code (POS_INITIAL/MEDIAL/FINAL).
+    str() gives the legacy 'POS_X|stroke' form for older consumers.
+    """
+    __slots__ = ('stroke', 'position')
+
+    def __init__(self, stroke: str, position: int):
+        self.stroke = stroke
+        self.position = position
+
+    @property
+    def token(self) -> str:
+        return POSITION_TOKENS[POSITION_ORDER[self.position]]
+
+    def __str__(self) -> str:
+        return f"{self.token}|{self.stroke}"
+
+    def __repr__(self) -> str:
+        return f"PositionedStroke({self.stroke!r}, {POSITION_ORDER[self.position]})"
+
+    def __eq__(self, other) -> bool:
+        return (isinstance(other, PositionedStroke)
+                and self.stroke == other.stroke and self.position == other.position)
+
+    def __hash__(self) -> int:
+        return hash((self.stroke, self.position))
 
 def phonemes_to_strokes(phonemes: List[str]) -> List[str]:
     """Convert phoneme list to stroke id sequence using deterministic rules.
@@ -42,20 +138,30 @@ def phonemes_to_strokes(phonemes: List[str]) -> List[str]:
     strokes: List[str] = []
 
     for p in phonemes:
-        p_upper = p.upper().strip()
-        # strip stress digits for vowels (e.g., AH0 -> AH)
-        if p_upper and p_upper[-1].isdigit():
-            p_upper = p_upper[:-1]
-
-        if p_upper in PHONEME_TO_STROKE:
-            strokes.extend(PHONEME_TO_STROKE[p_upper])
-        elif p_upper in VOWEL_MARKERS:
-            strokes.append(VOWEL_MARKERS[p_upper])
-        else:
-            strokes.append(f'RAW_{p_upper}')
+        strokes.extend(_phoneme_strokes(p))
 
     return strokes
 
+def normalize_phoneme(p: str) -> str:
+    """Upper-case, strip whitespace and stress digits (e.g., ah0 -> AH)."""
+    p_upper = p.upper().strip()
+    if p_upper and p_upper[-1].isdigit():
+        p_upper = p_upper[:-1]
+    return p_upper
+
+def _phoneme_strokes(p: str) -> Sequence[str]:
+    """Stroke ids for a single phoneme token (shared by the public passes)."""
+    p_upper = normalize_phoneme(p)
+    if telemetry.ACTIVE is not None:
+        telemetry.ACTIVE.phoneme_counts[p_upper] += 1
+
+    if p_upper in PHONEME_TO_STROKE:
+        return PHONEME_TO_STROKE[p_upper]
+    elif p_upper in VOWEL_MARKERS:
+        return [VOWEL_MARKERS[p_upper]]
+    else:
+        return [f'RAW_{p_upper}']
+
 def apply_positioning(strokes: List[str], idx: int, total: int) -> List[str]:
     """Annotate stroke sequence with a simple position token depending on
     whether it occurs at the initial, medial, or final position in the word.
@@ -63,25 +169,34 @@ def apply_positioning(strokes: List[str], idx: int, total: int) -> List[str]:
     idx: the index of the current token (0-based)
     total: total number of tokens (phoenemes)
     """
-    if total <= 1:
-        pos = POSITION_TOKENS['initial']
-    elif idx == 0:
-        pos = POSITION_TOKENS['initial']
-    elif idx == total - 1:
-        pos = POSITION_TOKENS['final']
-    else:
-        pos = POSITION_TOKENS['medial']
+    pos = POSITION_TOKENS[POSITION_ORDER[position_code(idx, total)]]
 
     # Prepend the position token to each stroke in this simple scheme
     return [f"{pos}|{s}" for s in strokes]
 
+def position_code(idx: int, total: int) -> int:
+    """Position code for token idx of total (initial/medial/final)."""
+    if total <= 1 or idx == 0:
+        return POS_INITIAL
+    if idx == total - 1:
+        return POS_FINAL
+    return POS_MEDIAL
+
+def position_word(phonemes: Sequence[str]) -> List[PositionedStroke]:
+    """Whole-word positioning pass: map every phoneme and tag its strokes
+    with a position code, without building 'POS_X|stroke' strings.
+    """
+    total = len(phonemes)
+    out: List[PositionedStroke] = []
+    for i, p in enumerate(phonemes):
+        pos = position_code(i, total)
+        for s in _phoneme_strokes(p):
+            out.append(PositionedStroke(s, pos))
+    return out
+
 if __name__ == '__main__':
     # quick smoke test
     sample = ['CH', 'EH', 'R']  # chair
-    base = phonemes_to_strokes(sample)
-    combined = []
-    for i, p in enumerate(sample):
-        strokes = phonemes_to_strokes([p])
-        combined.extend(apply_positioning(strokes, i, len(sample)))
+    combined = position_word(sample)
     print('Phonemes:', sample)
-    print('Strokes:', combined)
\ No newline at end of file
+    print('Strokes:', [str(t) for t in combined])
@@ -0,0 +1,104 @@
+"""
+Content hashes for incremental outline regeneration.
+
+Every generated entry records
+- phonemes_hash: hash of the phoneme tokens fed to the rule engine
+- rules_hash: hash of the rule-table entries those phonemes used
+
+A rebuild can then recompute the rules hash of an old entry against the
+current tables (a few dict lookups and one sha1) and copy the entry
+through untouched when it matches, so a change to one PHONEME_TO_STROKE
+entry only regenerates the words that contain that phoneme.
+
+Functions / classes:
+- phonemes_hash(phonemes) -> str
+- outline_hash(strokes) -> str
+- RuleHasher(phoneme_to_stroke, vowel_markers, rules).rules_hash(phonemes) -> str
+- RuleHasher.table_digest() -> str (all tables, e.g. for resume manifests)
+"""
+
+import hashlib
+import json
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from src.rule_engine.rule_engine_v2 import normalize_phoneme
+
+HASH_CHARS = 16
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:HASH_CHARS]
+
+
+def phonemes_hash(phonemes: Sequence[str]) -> str:
+    return _digest(' '.join(phonemes))
+
+
+def outline_hash(strokes: Sequence[str]) -> str:
+    """Identity of a stroke sequence (collapses duplicate variants)."""
+    return _digest(' '.join(strokes))
+
+
+class RuleHasher:
+    """Per-entry digests of a rule table, built lazily per phoneme.
+
+    With multi-phoneme rules (rule_automaton.py), a phoneme's digest also
+    covers every rule whose pattern contains it, so editing a cluster rule
+    invalidates exactly the words that could match it.
+    """
+
+    def __init__(self, phoneme_to_stroke: Dict[str, List[str]], vowel_markers: Dict[str, str],
+                 rules: Optional[Dict[Tuple[str, ...], List[str]]] = None):
+        self.phoneme_to_stroke = phoneme_to_stroke
+        self.vowel_markers = vowel_markers
+        self.rules = rules or {}
+        self._entry: Dict[str, str] = {}
+        self._norm: Dict[str, str] = {}
+
+    def entry_digest(self, p_upper: str) -> str:
+        """Digest of the table entry a normalised phoneme resolves to
+        (including 'no entry', which produces a RAW token).
+        """
+        digest = self._entry.get(p_upper)
+        if digest is None:
+            if p_upper in self.phoneme_to_stroke:
+                rule = ['stroke', p_upper, self.phoneme_to_stroke[p_upper]]
+            elif p_upper in self.vowel_markers:
+                rule = ['vowel', p_upper, self.vowel_markers[p_upper]]
+            else:
+                rule = ['raw', p_upper]
+            clusters = sorted([list(pattern), strokes] for pattern, strokes in self.rules.items()
+                              if p_upper in pattern)
+            if clusters:
+                rule.append(clusters)
+            digest = self._entry[p_upper] = _digest(json.dumps(rule))
+        return digest
+
+    def rules_hash(self, phonemes: Sequence[str]) -> str:
+        norm = self._norm
+        used = set()
+        for p in phonemes:
+            n = norm.get(p)
+            if n is None:
+                n = norm[p] = normalize_phoneme(p)
+            used.add(n)
+        return _digest(''.join(sorted(self.entry_digest(p) for p in used)))
+
+    def table_digest(self) -> str:
+        """Digest of the whole rule set (single-phoneme tables and cluster
+        rules), for results that depend on every entry at once."""
+        rules = sorted([list(pattern), strokes] for pattern, strokes in self.rules.items())
+        return _digest(json.dumps([self.phoneme_to_stroke, self.vowel_markers, rules],
+                                  sort_keys=True))
+
+    def clear(self, phoneme_to_stroke: Optional[Dict[str, List[str]]] = None,
+              vowel_markers: Optional[Dict[str, str]] = None,
+              rules: Optional[Dict[Tuple[str, ...], List[str]]] = None) -> None:
+        """Forget cached digests (call after editing the tables)."""
+        if phoneme_to_stroke is not None:
+            self.phoneme_to_stroke = phoneme_to_stroke
+        if vowel_markers is not None:
+            self.vowel_markers = vowel_markers
+        if rules is not None:
+            self.rules = rules
+        self._entry.clear()
@@ -0,0 +1,291 @@
+"""
+Stroke geometry: SVG path data -> resampled NumPy point arrays.
+
+Registry entries carry an SVG path (`svg_path`, or an `svg` file whose
+<path d="..."> elements are read). Each path is parsed once, flattened to
+a dense polyline and resampled to N points equally spaced by arc length,
+so recognition, rendering and scoring code all receive (N, 2) float32
+arrays in drawing order. Coordinates stay in SVG user units (y grows
+downwards).
+
+Supported commands: M L H V Q T C S A Z, absolute and relative. A move
+inside a path lifts the pen: the gap does not count towards arc length.
+
+Arrays are memoised per process and cached on disk as
+<cache_dir>/<sha1(path)[:16]>_<n>.npy, keyed by path text and resolution,
+so editing a path or changing N never serves stale geometry.
+
+Functions / classes:
+- parse_path(d) -> List[np.ndarray] (dense polyline per subpath)
+- resample(subpaths, n) -> np.ndarray (n, 2)
+- GeometryCache(cache_dir, n).path_points(d) -> np.ndarray (n, 2)
+- GeometryCache.stroke_points(stroke_id, registry) -> np.ndarray or None
+- GeometryCache.registry_points(registry) -> Dict[id, np.ndarray]
+"""
+
+import hashlib
+import math
+import os
+import re
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+DEFAULT_CACHE_DIR = Path('data/geometry')
+DEFAULT_POINTS = 64
+# polyline pieces per curve / arc segment before resampling
+CURVE_STEPS = 32
+
+_TOKEN = re.compile(r'[MmLlHhVvQqTtCcSsAaZz]|[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
+_ARG_COUNTS = {'M': 2, 'L': 2, 'H': 1, 'V': 1, 'Q': 4, 'T': 2, 'C': 6, 'S': 4, 'A': 7, 'Z': 0}
+
+
+def _bezier(points: np.ndarray, steps: int = CURVE_STEPS) -> np.ndarray:
+    """Sample a quadratic (3 points) or cubic (4 points) Bezier curve."""
+    t = np.linspace(0.0, 1.0, steps + 1)[1:, None]
+    u = 1.0 - t
+    if len(points) == 3:
+        return u * u * points[0] + 2 * u * t * points[1] + t * t * points[2]
+    return (u ** 3 * points[0] + 3 * u * u * t * points[1]
+            + 3 * u * t * t * points[2] + t ** 3 * points[3])
+
+
+def _arc(p0, rx, ry, phi_deg, large, sweep, p1, steps: int = CURVE_STEPS) -> np.ndarray:
+    """Sample an elliptical arc (SVG endpoint parameterisation, spec F.6.5)."""
+    x1, y1 = p0
+    x2, y2 = p1
+    if rx == 0 or ry == 0 or (x1 == x2 and y1 == y2):
+        return np.array([[x2, y2]])
+    rx, ry = abs(rx), abs(ry)
+    phi = math.radians(phi_deg % 360)
+    cos_p, sin_p = math.cos(phi), math.sin(phi)
+    dx, dy = (x1 - x2) / 2, (y1 - y2) / 2
+    xp = cos_p * dx + sin_p * dy
+    yp = -sin_p * dx + cos_p * dy
+    # scale radii up if they cannot span the endpoints
+    lam = (xp / rx) ** 2 + (yp / ry) ** 2
+    if lam > 1:
+        rx, ry = rx * math.sqrt(lam), ry * math.sqrt(lam)
+    num = rx * rx * ry * ry - rx * rx * yp * yp - ry * ry * xp * xp
+    den = rx * rx * yp * yp + ry * ry * xp * xp
+    coef = math.sqrt(max(num / den, 0.0)) if den else 0.0
+    if large == sweep:
+        coef = -coef
+    cxp, cyp = coef * rx * yp / ry, -coef * ry * xp / rx
+    cx = cos_p * cxp - sin_p * cyp + (x1 + x2) / 2
+    cy = sin_p * cxp + cos_p * cyp + (y1 + y2) / 2
+
+    def angle(ux, uy, vx, vy):
+        return math.atan2(ux * vy - uy * vx, ux * vx + uy * vy)
+
+    theta1 = angle(1, 0, (xp - cxp) / rx, (yp - cyp) / ry)
+    delta = angle((xp - cxp) / rx, (yp - cyp) / ry, (-xp - cxp) / rx, (-yp - cyp) / ry)
+    if not sweep and delta > 0:
+        delta -= 2 * math.pi
+    elif sweep and delta < 0:
+        delta += 2 * math.pi
+    theta = theta1 + delta * np.linspace(0.0, 1.0, steps + 1)[1:]
+    x = cx + rx * np.cos(theta) * cos_p - ry * np.sin(theta) * sin_p
+    y = cy + rx * np.cos(theta) * sin_p + ry * np.sin(theta) * cos_p
+    return np.stack([x, y], axis=1)
+
+
+def parse_path(d: str) -> List[np.ndarray]:
+    """Flatten SVG path data into one dense (k, 2) polyline per subpath."""
+    tokens = _TOKEN.findall(d)
+    subpaths: List[np.ndarray] = []
+    pieces: List[np.ndarray] = []
+    pos = np.zeros(2)
+    start = np.zeros(2)
+    last_ctrl = None  # (command letter, reflected control point source)
+    cmd = None
+    i = 0
+
+    def flush():
+        if pieces:
+            subpaths.append(np.concatenate(pieces))
+            pieces.clear()
+
+    while i < len(tokens):
+        if tokens[i].isalpha():
+            cmd = tokens[i]
+            i += 1
+        elif cmd is None:
+            raise ValueError(f'path data must start with a command: {d!r}')
+        upper = cmd.upper()
+        n = _ARG_COUNTS[upper]
+        args = [float(t) for t in tokens[i:i + n]]
+        if len(args) < n or any(t.isalpha() for t in tokens[i:i + n]):
+            raise ValueError(f'{cmd!r} needs {n} numbers in {d!r}')
+        i += n
+        rel = cmd.islower()
+        base = pos if rel else np.zeros(2)
+
+        if upper == 'M':
+            flush()
+            pos = base + args
+            start = pos.copy()
+            pieces.append(pos[None, :].copy())
+            # further coordinate pairs after M are implicit L
+            cmd = 'l' if rel else 'L'
+            last_ctrl = None
+            continue
+        if not pieces:
+            pieces.append(pos[None, :].copy())
+        if upper == 'Z':
+            pieces.append(start[None, :].copy())
+            pos = start.copy()
+            last_ctrl = None
+            if i < len(tokens) and not tokens[i].isalpha():
+                raise ValueError(f'numbers after Z in {d!r}')
+            continue
+        if upper == 'L':
+            end = base + args
+            pieces.append(end[None, :])
+            ctrl = None
+        elif upper == 'H':
+            end = np.array([args[0] + (pos[0] if rel else 0.0), pos[1]])
+            pieces.append(end[None, :])
+            ctrl = None
+        elif upper == 'V':
+            end = np.array([pos[0], args[0] + (pos[1] if rel else 0.0)])
+            pieces.append(end[None, :])
+            ctrl = None
+        elif upper in ('Q', 'T'):
+            if upper == 'Q':
+                ctrl = base + args[0:2]
+                end = base + args[2:4]
+            else:
+                ctrl = (2 * pos - last_ctrl[1]) if last_ctrl and last_ctrl[0] == 'Q' else pos.copy()
+                end = base + args[0:2]
+            pieces.append(_bezier(np.array([pos, ctrl, end])))
+            ctrl = ('Q', ctrl)
+        elif upper in ('C', 'S'):
+            if upper == 'C':
+                c1 = base + args[0:2]
+                c2 = base + args[2:4]
+                end = base + args[4:6]
+            else:
+                c1 = (2 * pos - last_ctrl[1]) if last_ctrl and last_ctrl[0] == 'C' else pos.copy()
+                c2 = base + args[0:2]
+                end = base + args[2:4]
+            pieces.append(_bezier(np.array([pos, c1, c2, end])))
+            ctrl = ('C', c2)
+        else:  # 'A'
+            end = base + args[5:7]
+            pieces.append(_arc(pos, args[0], args[1], args[2], bool(args[3]), bool(args[4]), end))
+            ctrl = None
+        last_ctrl = ctrl
+        pos = np.asarray(end, dtype=float)
+    flush()
+    return subpaths
+
+
+def resample(subpaths: List[np.ndarray], n: int = DEFAULT_POINTS) -> np.ndarray:
+    """n points equally spaced by arc length over all subpaths, in order
+    (pen-up gaps between subpaths have zero length).
+    """
+    if not subpaths:
+        raise ValueError('empty path')
+    points = np.concatenate(subpaths)
+    seg = np.linalg.norm(np.diff(points, axis=0), axis=1)
+    # zero-length joins between subpaths
+    joins = np.cumsum([len(s) for s in subpaths])[:-1] - 1
+    seg[joins] = 0.0
+    dist = np.concatenate([[0.0], np.cumsum(seg)])
+    if dist[-1] == 0:
+        return np.repeat(points[:1], n, axis=0).astype(np.float32)
+    targets = np.linspace(0.0, dist[-1], n)
+    # ties (zero-length segments) resolve to the later point
+    idx = np.clip(np.searchsorted(dist, targets, side='right') - 1, 0, len(points) - 2)
+    span = dist[idx + 1] - dist[idx]
+    frac = np.divide(targets - dist[idx], span, out=np.zeros_like(targets), where=span > 0)
+    out = points[idx] + frac[:, None] * (points[idx + 1] - points[idx])
+    return out.astype(np.float32)
+
+
+def svg_file_path_data(svg_file: Path) -> Optional[str]:
+    """Concatenated d attributes of the <path> elements in an SVG file."""
+    try:
+        root = ET.parse(svg_file).getroot()
+    except (OSError, ET.ParseError):
+        return None
+    ds = [el.get('d') for el in root.iter() if el.tag.rsplit('}', 1)[-1] == 'path' and el.get('d')]
+    return ' '.join(ds) or None
+
+
+def entry_path_data(entry) -> Optional[str]:
+    """Path data for a registry entry: svg_path, else its svg file."""
+    if entry.get('svg_path'):
+        return entry['svg_path']
+    if entry.get('svg'):
+        return svg_file_path_data(Path(entry['svg']))
+    return None
+
+
+def path_hash(d: str) -> str:
+    return hashlib.sha1(' '.join(d.split()).encode('utf-8')).hexdigest()[:16]
+
+
+class GeometryCache:
+    """Resampled point arrays, memoised in memory and on disk."""
+
+    def __init__(self, cache_dir: Optional[Path] = DEFAULT_CACHE_DIR, n: int = DEFAULT_POINTS):
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self.n = n
+        self._memo: Dict[str, np.ndarray] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _file(self, key: str) -> Path:
+        return self.cache_dir / f'{key}_{self.n}.npy'
+
+    def path_points(self, d: str) -> np.ndarray:
+        """(n, 2) float32 points for path data `d` (read-only array)."""
+        key = path_hash(d)
+        points = self._memo.get(key)
+        if points is not None:
+            self.hits += 1
+            return points
+        if self.cache_dir is not None and self._file(key).exists():
+            self.hits += 1
+            points = np.load(self._file(key))
+        else:
+            self.misses += 1
+            points = resample(parse_path(d), self.n)
+            if self.cache_dir is not None:
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+                # np.save appends .npy when missing; write to a temp name then swap
+                tmp = self._file(key).with_name(f'{key}_{self.n}.tmp.npy')
+                np.save(tmp, points)
+                os.replace(tmp, self._file(key))
+        points.setflags(write=False)
+        self._memo[key] = points
+        return points
+
+    def stroke_points(self, stroke_id: str, registry) -> Optional[np.ndarray]:
+        entry = registry.get(stroke_id)
+        d = entry_path_data(entry) if entry is not None else None
+        return self.path_points(d) if d else None
+
+    def registry_points(self, registry) -> Dict[str, np.ndarray]:
+        """Points for every registry stroke that has path data."""
+        out = {}
+        for stroke_id in registry:
+            points = self.stroke_points(stroke_id, registry)
+            if points is not None:
+                out[stroke_id] = points
+        return out
+
+
+if __name__ == '__main__':
+    # quick smoke test
+    from src.rule_engine.stroke_registry import load_registry
+
+    cache = GeometryCache(n=16)
+    for stroke_id, points in cache.registry_points(load_registry()).items():
+        length = np.linalg.norm(np.diff(points, axis=0), axis=1).sum()
+        print(f'{stroke_id}: start {points[0].tolist()} end {points[-1].tolist()} '
+              f'length {length:.1f}')
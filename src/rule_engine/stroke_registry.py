@@ -0,0 +1,121 @@
+"""
+Canonical stroke registry loaded from data/strokes/unit_*.json.
+
+The unit files are the single source of truth for stroke ids. They are
+read once per process (per glob pattern). Every entry is then frozen
+into read-only mappings, and indexes are built up front so that all
+lookups are one dict access:
+
+  by_id          stroke id -> entry
+  by_consonant   consonant ('P', 'CH', 'TH', ...) -> ids
+  by_unit        unit number -> ids, in file order
+  by_stroke_type stroke_type -> ids
+  by_pair        stroke id -> id of the stroke it pairs with (resolved
+                 pairs_with references only; see dangling_pairs())
+
+Functions / classes:
+- load_registry(pattern) -> StrokeRegistry (cached per pattern)
+- StrokeRegistry.get(stroke_id) / .pair(stroke_id) / .unit(n) / .consonant(c)
+- StrokeRegistry.dangling_pairs() -> List[(id, pairs_with)]
+"""
+
+import glob
+import json
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+DEFAULT_REGISTRY_GLOB = 'data/strokes/unit_*.json'
+
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _group(entries, field: str) -> Mapping[Any, Tuple[str, ...]]:
+    groups: Dict[Any, List[str]] = {}
+    for entry in entries:
+        if entry.get(field) is not None:
+            groups.setdefault(entry[field], []).append(entry['id'])
+    return MappingProxyType({k: tuple(v) for k, v in groups.items()})
+
+
+class StrokeRegistry:
+    """Read-only, pre-indexed view over the stroke unit files."""
+
+    def __init__(self, entries: List[Dict[str, Any]], sources: Tuple[str, ...] = ()):
+        by_id: Dict[str, Mapping[str, Any]] = {}
+        for entry in entries:
+            if entry['id'] in by_id:
+                raise ValueError(f"duplicate stroke id {entry['id']!r}")
+            by_id[entry['id']] = _freeze(entry)
+        frozen = list(by_id.values())
+
+        self.sources = sources
+        self.by_id: Mapping[str, Mapping[str, Any]] = MappingProxyType(by_id)
+        self.ids = frozenset(by_id)
+        self.by_consonant = _group(frozen, 'consonant')
+        self.by_unit = _group(frozen, 'unit')
+        self.by_stroke_type = _group(frozen, 'stroke_type')
+        self.by_pair: Mapping[str, str] = MappingProxyType({
+            e['id']: e['pairs_with'] for e in frozen if e.get('pairs_with') in by_id
+        })
+
+    @classmethod
+    def from_files(cls, paths) -> 'StrokeRegistry':
+        entries = []
+        for path in paths:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            for entry in data['strokes']:
+                entry.setdefault('unit', data.get('unit'))
+                entries.append(entry)
+        return cls(entries, tuple(str(p) for p in paths))
+
+    def __len__(self) -> int:
+        return len(self.by_id)
+
+    def __contains__(self, stroke_id: str) -> bool:
+        return stroke_id in self.by_id
+
+    def __iter__(self):
+        return iter(self.by_id)
+
+    def get(self, stroke_id: str) -> Optional[Mapping[str, Any]]:
+        return self.by_id.get(stroke_id)
+
+    def pair(self, stroke_id: str) -> Optional[Mapping[str, Any]]:
+        """Entry of the stroke `stroke_id` pairs with (e.g. P -> B)."""
+        other = self.by_pair.get(stroke_id)
+        return self.by_id[other] if other is not None else None
+
+    def unit(self, number: int) -> Tuple[Mapping[str, Any], ...]:
+        return tuple(self.by_id[i] for i in self.by_unit.get(number, ()))
+
+    def consonant(self, consonant: str) -> Tuple[Mapping[str, Any], ...]:
+        return tuple(self.by_id[i] for i in self.by_consonant.get(consonant.upper(), ()))
+
+    def dangling_pairs(self) -> List[Tuple[str, str]]:
+        """(id, pairs_with) for every pairs_with that names no registry id."""
+        return [(sid, e['pairs_with']) for sid, e in sorted(self.by_id.items())
+                if e.get('pairs_with') and e['pairs_with'] not in self.by_id]
+
+
+@lru_cache(maxsize=None)
+def load_registry(pattern: str = DEFAULT_REGISTRY_GLOB) -> StrokeRegistry:
+    """The registry for `pattern`, read from disk once per process."""
+    return StrokeRegistry.from_files(sorted(glob.glob(pattern)))
+
+
+if __name__ == '__main__':
+    # quick smoke test
+    registry = load_registry()
+    print(f'{len(registry)} strokes from {len(registry.sources)} files')
+    for number, ids in sorted(registry.by_unit.items()):
+        print(f'unit {number}: {", ".join(ids)}')
+    print('P pairs with', registry.pair('U1_P_light')['id'])
+    print('dangling pairs_with:', registry.dangling_pairs())
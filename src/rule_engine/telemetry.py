@@ -0,0 +1,140 @@
+"""
+Optional instrumentation for the rule engines.
+
+When a RuleTelemetry is enabled, the engines count every normalised
+phoneme they map (one Counter increment per phoneme), the rule automaton
+(rule_automaton.py) also counts each multi-phoneme cluster rule it
+applies, keyed by the rule's phoneme tuple, and callers can accumulate
+wall time per pipeline stage. Classification into mapping-entry
+hits, vowel markers and RAW_<PHONEME> tokens happens only when the
+summary is built, so the counters stay cheap enough to leave on during
+large dataset runs. With telemetry disabled the engines pay a single
+None check.
+
+Usage:
+    from src.rule_engine import telemetry
+    t = telemetry.enable()
+    ... run the engine ...
+    print(t.format_summary(PHONEME_TO_STROKE, VOWEL_MARKERS))
+    telemetry.disable()
+
+Functions / classes:
+- RuleTelemetry.count_codes(codes, names, rule_patterns) (batch API)
+- RuleTelemetry.add_time(stage, seconds)
+- RuleTelemetry.merge(other) (combine worker counters)
+- RuleTelemetry.summary(phoneme_to_stroke, vowel_markers, top, cluster_rules) -> dict
+- enable(telemetry=None) -> RuleTelemetry / disable()
+"""
+
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# The engines read this module attribute on every call
+ACTIVE: Optional['RuleTelemetry'] = None
+
+
+class RuleTelemetry:
+    def __init__(self):
+        # normalised phoneme -> number of times it was mapped
+        self.phoneme_counts: Counter = Counter()
+        # multi-phoneme rule pattern (('P', 'L'), ...) -> times applied
+        self.rule_counts: Counter = Counter()
+        self.stage_seconds: Dict[str, float] = defaultdict(float)
+        self.stage_calls: Dict[str, int] = defaultdict(int)
+
+    def count_codes(self, codes, names: Sequence[str],
+                    rule_patterns: Optional[Dict[int, Tuple[str, ...]]] = None) -> None:
+        """Count interned phoneme codes (batch API) in one bincount. Codes
+        in rule_patterns are cluster rules and go to rule_counts."""
+        import numpy as np
+
+        counts = np.bincount(codes, minlength=len(names))
+        for code in np.flatnonzero(counts).tolist():
+            pattern = rule_patterns.get(code) if rule_patterns else None
+            if pattern is not None:
+                self.rule_counts[pattern] += int(counts[code])
+            else:
+                self.phoneme_counts[names[code]] += int(counts[code])
+
+    def merge(self, other: 'RuleTelemetry') -> None:
+        """Fold in counters from another process (e.g. a shard worker)."""
+        self.phoneme_counts.update(other.phoneme_counts)
+        self.rule_counts.update(other.rule_counts)
+        for stage, secs in other.stage_seconds.items():
+            self.add_time(stage, secs, other.stage_calls[stage])
+
+    def add_time(self, stage: str, seconds: float, calls: int = 1) -> None:
+        self.stage_seconds[stage] += seconds
+        self.stage_calls[stage] += calls
+
+    def summary(self, phoneme_to_stroke: Dict[str, List[str]],
+                vowel_markers: Dict[str, str], top: int = 20,
+                cluster_rules: Optional[Iterable[Tuple[str, ...]]] = None) -> Dict[str, Any]:
+        """Pass cluster_rules (e.g. RuleAutomaton.rules) to list cluster
+        rules that never fired; otherwise only counted ones appear."""
+        rule_hits = {p: self.phoneme_counts.get(p, 0) for p in phoneme_to_stroke}
+        patterns = list(cluster_rules) if cluster_rules is not None else []
+        seen = set(patterns)
+        patterns += [p for p in self.rule_counts if p not in seen]
+        cluster_hits = {' '.join(p): self.rule_counts.get(p, 0) for p in patterns}
+        vowel_hits = {p: self.phoneme_counts.get(p, 0) for p in vowel_markers}
+        raw = Counter({f'RAW_{p}': n for p, n in self.phoneme_counts.items()
+                       if p not in phoneme_to_stroke and p not in vowel_markers})
+        total = sum(self.phoneme_counts.values())
+        return {
+            'phonemes': total,
+            'rule_hits': rule_hits,
+            'unused_rules': sorted(p for p, n in rule_hits.items() if n == 0),
+            'cluster_rule_hits': cluster_hits,
+            'unused_cluster_rules': sorted(p for p, n in cluster_hits.items() if n == 0),
+            'vowel_hits': vowel_hits,
+            'raw_tokens': sum(raw.values()),
+            'raw_rate': round(sum(raw.values()) / total, 4) if total else 0.0,
+            'top_raw': raw.most_common(top),
+            'stages': {
+                stage: {
+                    'seconds': round(secs, 4),
+                    'calls': self.stage_calls[stage],
+                    'us_per_call': round(secs * 1e6 / self.stage_calls[stage], 3)
+                    if self.stage_calls[stage] else 0.0,
+                }
+                for stage, secs in self.stage_seconds.items()
+            },
+        }
+
+    def format_summary(self, phoneme_to_stroke: Dict[str, List[str]],
+                       vowel_markers: Dict[str, str], top: int = 20,
+                       cluster_rules: Optional[Iterable[Tuple[str, ...]]] = None) -> str:
+        s = self.summary(phoneme_to_stroke, vowel_markers, top, cluster_rules)
+        lines = [f"Rule telemetry: {s['phonemes']} phonemes, "
+                 f"{s['raw_tokens']} RAW tokens ({s['raw_rate']:.1%})"]
+        lines.append('  rule hits: ' + ', '.join(
+            f'{p}={n}' for p, n in sorted(s['rule_hits'].items(), key=lambda kv: -kv[1])))
+        if s['unused_rules']:
+            lines.append('  never fired: ' + ', '.join(s['unused_rules']))
+        if s['cluster_rule_hits']:
+            lines.append('  cluster rules: ' + ', '.join(
+                f'{p}={n}' for p, n in sorted(s['cluster_rule_hits'].items(),
+                                              key=lambda kv: -kv[1])))
+        if s['unused_cluster_rules']:
+            lines.append('  cluster rules never fired: ' + ', '.join(s['unused_cluster_rules']))
+        lines.append('  vowel markers: ' + ', '.join(
+            f'{p}={n}' for p, n in sorted(s['vowel_hits'].items(), key=lambda kv: -kv[1]) if n))
+        if s['top_raw']:
+            lines.append('  top RAW: ' + ', '.join(f'{t}={n}' for t, n in s['top_raw']))
+        for stage, st in s['stages'].items():
+            lines.append(f"  stage {stage}: {st['seconds']:.3f}s over {st['calls']} calls "
+                         f"({st['us_per_call']:.2f}us/call)")
+        return '\n'.join(lines)
+
+
+def enable(telemetry: Optional[RuleTelemetry] = None) -> RuleTelemetry:
+    """Install (and return) the telemetry object the engines report to."""
+    global ACTIVE
+    ACTIVE = telemetry if telemetry is not None else RuleTelemetry()
+    return ACTIVE
+
+
+def disable() -> None:
+    global ACTIVE
+    ACTIVE = None
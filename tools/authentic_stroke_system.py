@@ -266,22 +266,23 @@ class AuthenticStrokeSystem:
             }
         }
     
+        # Lookup indexes, built once from the definitions above
+        self._strokes_by_sound = {}
+        self._units_by_number = {}
+        for unit_name, unit_data in self.stroke_definitions.items():
+            unit_number = int(unit_name.split('_')[1])
+            self._units_by_number.setdefault(unit_number, unit_data)
+            for consonant, stroke_data in unit_data['strokes'].items():
+                # first unit that teaches a sound wins
+                self._strokes_by_sound.setdefault(consonant, stroke_data)
+    
     def get_stroke_by_sound(self, consonant):
         """Get stroke information for a specific consonant sound"""
-        for unit_name, unit_data in self.stroke_definitions.items():
-            if consonant in unit_data['strokes']:
-                return unit_data['strokes'][consonant]
-        return None
+        return self._strokes_by_sound.get(consonant)
     
     def get_unit_strokes(self, unit_number):
-        """Get all strokes taught in a specific unit"""
-        unit_key = f'unit_{unit_number}_' + [
-            'straight_downstrokes', 'curved_strokes', 'horizontal_strokes'
-        ][unit_number - 1]
-        
-        if unit_key in self.stroke_definitions:
-            return self.stroke_definitions[unit_key]
-        return None
+        """Get all strokes taught in a specific unit (None if not defined)"""
+        return self._units_by_number.get(unit_number)
     
     def generate_stroke_recognition_exercises(self):
         """Generate exercises for learning stroke formations"""